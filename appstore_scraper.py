@@ -1,41 +1,72 @@
-import requests
-from bs4 import BeautifulSoup
 import csv
-import time
-import random
 import json
 import logging
-from urllib.parse import urljoin, urlparse
 import re
+import argparse
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from response_cache import ResponseCache
+from archive import open_archive
+from rate_control import AdaptiveRateController
+from retry import FetchError, ErrorBudgetExceeded
+from transport import Transport
+from parser_backend import make_soup, BACKENDS
+from sinks import open_sink, SINKS
+from card_extractor import CardExtractor, CardField
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def _app_card(store_url, last_field):
+    # Fields in output order; each card is walked once for all of them
+    return CardExtractor([
+        CardField('app_name', ['h3', 'h2', 'h4'], r'title|name|app'),
+        CardField('developer', ['span', 'div'], r'developer|publisher|company'),
+        CardField('rating', ['span', 'div'], r'rating|stars|score'),
+        CardField('reviews_count', ['span', 'div'], r'reviews|review-count'),
+        CardField('price', ['span', 'div'], r'price|cost', default="Free"),
+        CardField('category', ['span', 'div'], r'category|genre'),
+        CardField('description', ['p', 'div'], r'description|summary'),
+        CardField('link', 'a', base_url=store_url),
+        CardField('size', ['span', 'div'], r'size|download-size'),
+        last_field,
+    ])
+
+PLAYSTORE_CARD = _app_card("https://play.google.com", CardField('downloads', ['span', 'div'], r'downloads|installs'))
+APPSTORE_CARD = _app_card("https://apps.apple.com", CardField('age_rating', ['span', 'div'], r'age|content-rating'))
+
+# Columns of an output mixing both stores: every field either store's records have
+APP_FIELDS = list(dict.fromkeys(
+    [field.name for card in (PLAYSTORE_CARD, APPSTORE_CARD) for field in card.fields] + ['store']
+))
+
 class AppStoreScraper:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
+    def __init__(self, parser=None, sink=None, cache=None, archive=None):
+        self.parser = parser
+        self.cache = cache
+        self.archive = archive
+        self.sink = sink
+        self.transport = Transport(
+            headers={'Upgrade-Insecure-Requests': '1'},
+            cache=cache,
+            archive=archive,
+            # App stores are sensitive to scraping, so use longer delays
+            rate_controller=AdaptiveRateController(min_delay=3.0, max_delay=5.0),
+        )
+        self.session = self.transport.session
         self.data = []
+        self.item_count = 0
         self.max_items = 5000
+        self._emit_lock = threading.Lock()
         
     def get_page(self, url):
         """Get a page with error handling and rate limiting"""
         try:
-            # App stores are sensitive to scraping, so use longer delays
-            time.sleep(random.uniform(3.0, 5.0))
-            
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
+            return self.transport.get(url)
+        except FetchError as e:
             logger.error(f"Error fetching {url}: {e}")
             return None
     
@@ -52,19 +83,21 @@ class AppStoreScraper:
         if not html_content:
             return []
         
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = make_soup(html_content, self.parser)
         
         # Look for app cards/items
         app_items = soup.find_all(['div', 'article'], class_=re.compile(r'app|card|item|result'))
         
+        records = []
         for item in app_items:
-            if len(self.data) >= self.max_items:
+            if self.item_count + len(records) >= self.max_items:
                 break
                 
             app_data = self.extract_playstore_data(item)
             if app_data:
-                self.data.append(app_data)
+                records.append(app_data)
         
+        self.emit(records)
         return self.data
     
     def scrape_appstore_category(self, category="apps", search_term=None):
@@ -80,77 +113,29 @@ class AppStoreScraper:
         if not html_content:
             return []
         
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = make_soup(html_content, self.parser)
         
         # Look for app cards/items
         app_items = soup.find_all(['div', 'article'], class_=re.compile(r'app|card|item|result'))
         
+        records = []
         for item in app_items:
-            if len(self.data) >= self.max_items:
+            if self.item_count + len(records) >= self.max_items:
                 break
                 
             app_data = self.extract_appstore_data(item)
             if app_data:
-                self.data.append(app_data)
+                records.append(app_data)
         
+        self.emit(records)
         return self.data
     
     def extract_playstore_data(self, item):
         """Extract app data from Play Store item"""
         try:
-            # Find app name
-            name_elem = item.find(['h3', 'h2', 'h4'], class_=re.compile(r'title|name|app'))
-            name = name_elem.get_text(strip=True) if name_elem else "N/A"
-            
-            # Find developer
-            dev_elem = item.find(['span', 'div'], class_=re.compile(r'developer|publisher|company'))
-            developer = dev_elem.get_text(strip=True) if dev_elem else "N/A"
-            
-            # Find rating
-            rating_elem = item.find(['span', 'div'], class_=re.compile(r'rating|stars|score'))
-            rating = rating_elem.get_text(strip=True) if rating_elem else "N/A"
-            
-            # Find reviews count
-            reviews_elem = item.find(['span', 'div'], class_=re.compile(r'reviews|review-count'))
-            reviews = reviews_elem.get_text(strip=True) if reviews_elem else "N/A"
-            
-            # Find price
-            price_elem = item.find(['span', 'div'], class_=re.compile(r'price|cost'))
-            price = price_elem.get_text(strip=True) if price_elem else "Free"
-            
-            # Find category
-            cat_elem = item.find(['span', 'div'], class_=re.compile(r'category|genre'))
-            category = cat_elem.get_text(strip=True) if cat_elem else "N/A"
-            
-            # Find description
-            desc_elem = item.find(['p', 'div'], class_=re.compile(r'description|summary'))
-            description = desc_elem.get_text(strip=True) if desc_elem else "N/A"
-            
-            # Find link
-            link_elem = item.find('a')
-            link = urljoin("https://play.google.com", link_elem.get('href')) if link_elem else "N/A"
-            
-            # Find size
-            size_elem = item.find(['span', 'div'], class_=re.compile(r'size|download-size'))
-            size = size_elem.get_text(strip=True) if size_elem else "N/A"
-            
-            # Find downloads
-            downloads_elem = item.find(['span', 'div'], class_=re.compile(r'downloads|installs'))
-            downloads = downloads_elem.get_text(strip=True) if downloads_elem else "N/A"
-            
-            return {
-                'app_name': name,
-                'developer': developer,
-                'rating': rating,
-                'reviews_count': reviews,
-                'price': price,
-                'category': category,
-                'description': description,
-                'link': link,
-                'size': size,
-                'downloads': downloads,
-                'store': 'Google Play Store'
-            }
+            app_data = PLAYSTORE_CARD.extract(item)
+            app_data['store'] = 'Google Play Store'
+            return app_data
         except Exception as e:
             logger.error(f"Error extracting Play Store data: {e}")
             return None
@@ -158,70 +143,65 @@ class AppStoreScraper:
     def extract_appstore_data(self, item):
         """Extract app data from App Store item"""
         try:
-            # Find app name
-            name_elem = item.find(['h3', 'h2', 'h4'], class_=re.compile(r'title|name|app'))
-            name = name_elem.get_text(strip=True) if name_elem else "N/A"
-            
-            # Find developer
-            dev_elem = item.find(['span', 'div'], class_=re.compile(r'developer|publisher|company'))
-            developer = dev_elem.get_text(strip=True) if dev_elem else "N/A"
-            
-            # Find rating
-            rating_elem = item.find(['span', 'div'], class_=re.compile(r'rating|stars|score'))
-            rating = rating_elem.get_text(strip=True) if rating_elem else "N/A"
-            
-            # Find reviews count
-            reviews_elem = item.find(['span', 'div'], class_=re.compile(r'reviews|review-count'))
-            reviews = reviews_elem.get_text(strip=True) if reviews_elem else "N/A"
-            
-            # Find price
-            price_elem = item.find(['span', 'div'], class_=re.compile(r'price|cost'))
-            price = price_elem.get_text(strip=True) if price_elem else "Free"
-            
-            # Find category
-            cat_elem = item.find(['span', 'div'], class_=re.compile(r'category|genre'))
-            category = cat_elem.get_text(strip=True) if cat_elem else "N/A"
-            
-            # Find description
-            desc_elem = item.find(['p', 'div'], class_=re.compile(r'description|summary'))
-            description = desc_elem.get_text(strip=True) if desc_elem else "N/A"
-            
-            # Find link
-            link_elem = item.find('a')
-            link = urljoin("https://apps.apple.com", link_elem.get('href')) if link_elem else "N/A"
-            
-            # Find size
-            size_elem = item.find(['span', 'div'], class_=re.compile(r'size|download-size'))
-            size = size_elem.get_text(strip=True) if size_elem else "N/A"
-            
-            # Find age rating
-            age_elem = item.find(['span', 'div'], class_=re.compile(r'age|content-rating'))
-            age_rating = age_elem.get_text(strip=True) if age_elem else "N/A"
-            
-            return {
-                'app_name': name,
-                'developer': developer,
-                'rating': rating,
-                'reviews_count': reviews,
-                'price': price,
-                'category': category,
-                'description': description,
-                'link': link,
-                'size': size,
-                'age_rating': age_rating,
-                'store': 'Apple App Store'
-            }
+            app_data = APPSTORE_CARD.extract(item)
+            app_data['store'] = 'Apple App Store'
+            return app_data
         except Exception as e:
             logger.error(f"Error extracting App Store data: {e}")
             return None
     
+    def emit(self, records):
+        """Stream records to the sink, or keep them in memory without one.
+        
+        Safe to call from several crawls at once; max_items holds across all of them.
+        """
+        with self._emit_lock:
+            records = records[:max(self.max_items - self.item_count, 0)]
+            self.item_count += len(records)
+            if self.sink:
+                self.sink.write_many(records)
+            else:
+                self.data.extend(records)
+    
+    def scrape_stores(self, stores=('playstore', 'appstore'), search_terms=(None,), categories=None, workers=None):
+        """Crawl every store for every search term (or category) at the same time.
+        
+        Each crawl runs on its own thread and feeds the shared output through
+        emit(). Every store is a separate host with its own adaptive rate limit,
+        so crawls of different stores overlap fully, while crawls of the same
+        store take turns under its limit.
+        """
+        crawlers = {
+            'playstore': self.scrape_playstore_category,
+            'appstore': self.scrape_appstore_category,
+        }
+        if categories:
+            jobs = [(store, {'category': category}) for store in stores for category in categories]
+        else:
+            jobs = [(store, {'search_term': term}) for store in stores for term in search_terms]
+        
+        with ThreadPoolExecutor(max_workers=workers or len(jobs)) as pool:
+            futures = {pool.submit(crawlers[store], **kwargs): (store, kwargs) for store, kwargs in jobs}
+            for future in as_completed(futures):
+                store, kwargs = futures[future]
+                try:
+                    future.result()
+                except ErrorBudgetExceeded:
+                    raise
+                except Exception as e:
+                    logger.error(f"Crawl of {store} {kwargs} failed: {e}")
+        
+        logger.info(f"Scraped {self.item_count} apps from {len(jobs)} crawls")
+        return self.data
+    
     def save_to_csv(self, filename='appstore_data.csv'):
         """Save scraped data to CSV file"""
         if not self.data:
             logger.warning("No data to save")
             return
         
-        fieldnames = list(self.data[0].keys()) if self.data else []
+        # Records from both stores differ in their last field, so take every key in order
+        fieldnames = list(dict.fromkeys(key for record in self.data for key in record))
         
         with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
@@ -242,7 +222,34 @@ class AppStoreScraper:
         logger.info(f"Saved {len(self.data)} items to {filename}")
 
 def main():
-    scraper = AppStoreScraper()
+    parser = argparse.ArgumentParser(description='App Store Scraper')
+    parser.add_argument('--parser', choices=['auto'] + list(BACKENDS), default='auto', help='HTML parser backend')
+    parser.add_argument('--cache', action='store_true', help='Cache responses on disk between runs')
+    parser.add_argument('--record', metavar='ARCHIVE', help='Record every response to an archive')
+    parser.add_argument('--replay', metavar='ARCHIVE', help='Serve responses from an archive instead of the network')
+    parser.add_argument('--stores', nargs='+', choices=['playstore', 'appstore'],
+                        help='Crawl these stores concurrently instead of showing the menu')
+    parser.add_argument('--search', nargs='+', metavar='TERM', help='Search terms to crawl (with --stores)')
+    parser.add_argument('--categories', nargs='+', metavar='CATEGORY', help='Categories to crawl (with --stores)')
+    parser.add_argument('--output', '-o', default='all_appstores.csv', help='Output file (with --stores)')
+    parser.add_argument('--format', '-f', choices=list(SINKS), help='Output format (with --stores, default from the extension)')
+    args = parser.parse_args()
+    
+    scraper = AppStoreScraper(
+        parser=args.parser,
+        cache=ResponseCache() if args.cache else None,
+        archive=open_archive(args.record, args.replay),
+    )
+    
+    if args.stores:
+        try:
+            with open_sink(args.output, args.format, fieldnames=APP_FIELDS) as sink:
+                scraper.sink = sink
+                scraper.scrape_stores(args.stores, search_terms=args.search or [None], categories=args.categories)
+        except ErrorBudgetExceeded as e:
+            logger.error(f"Aborting: {e}")
+            sys.exit(1)
+        return
     
     print("App Store Scraper")
     print("1. Scrape Google Play Store")
@@ -270,14 +277,8 @@ def main():
             search_term = input("Enter search term (optional, press Enter to skip): ")
             search_term = search_term if search_term.strip() else None
             
-            # Scrape both stores
-            playstore_data = scraper.scrape_playstore_category(search_term=search_term)
-            scraper.data = []  # Reset for App Store
-            appstore_data = scraper.scrape_appstore_category(search_term=search_term)
-            
-            # Combine data
-            all_data = playstore_data + appstore_data
-            scraper.data = all_data
+            # Scrape both stores at the same time into one combined list
+            scraper.scrape_stores(search_terms=[search_term])
             
             scraper.save_to_csv('all_appstores.csv')
             scraper.save_to_json('all_appstores.json')
@@ -0,0 +1,152 @@
+import gzip
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+class ResponseArchive:
+    """Append-only archive of raw HTTP responses with a sidecar index.
+
+    Each response is written as its own gzip member holding a WARC-style
+    record (a header block, then the HTTP status line and headers, then the
+    raw body), so any record can be decompressed alone from its offset. The
+    `<path>.idx` file holds one JSON line per record with the URL, offset and
+    compressed length.
+
+    In "record" mode every response fetched through the session is appended.
+    In "replay" mode responses are served from the archive, and a URL that
+    was never recorded gets a 404 without touching the network, so it is not
+    retried and ends pagination like a missing page would.
+    """
+
+    def __init__(self, path, mode='record'):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown archive mode '{mode}'")
+        self.path = path
+        self.index_path = path + '.idx'
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._index = {}
+        if mode == 'replay':
+            self._load_index()
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    def install(self, session):
+        """Route all of a session's HTTP(S) traffic through this archive"""
+        adapter = ReplayAdapter(self) if self.replaying else RecordingAdapter(self)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            raise FileNotFoundError(f"No archive index at {self.index_path}")
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    # A URL recorded more than once replays its latest response
+                    self._index[entry["url"]] = entry
+        logger.info(f"Loaded {len(self._index)} archived responses from {self.path}")
+
+    def append(self, url, status, reason, headers, body):
+        """Append one response to the archive and its index"""
+        http_block = f"HTTP/1.1 {status} {reason or ''}\r\n"
+        http_block += ''.join(f"{name}: {value}\r\n" for name, value in headers.items())
+        payload = http_block.encode('latin-1', errors='replace') + b"\r\n" + body
+        warc_header = (
+            "WARC/1.1\r\n"
+            "WARC-Type: response\r\n"
+            f"WARC-Target-URI: {url}\r\n"
+            f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}\r\n"
+            "Content-Type: application/http;msgtype=response\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n"
+        ).encode('utf-8')
+        member = gzip.compress(warc_header + payload + b"\r\n\r\n")
+
+        with self._lock:
+            with open(self.path, 'ab') as f:
+                offset = f.tell()
+                f.write(member)
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"url": url, "offset": offset, "length": len(member), "status": status}) + '\n')
+
+    def lookup(self, url):
+        """Return (status, reason, headers, body) for a recorded URL, or None"""
+        entry = self._index.get(url)
+        if entry is None:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(entry["offset"])
+            record = gzip.decompress(f.read(entry["length"]))
+
+        _, _, payload = record.partition(b"\r\n\r\n")
+        http_block, _, body = payload.partition(b"\r\n\r\n")
+        body = body[:-4] if body.endswith(b"\r\n\r\n") else body
+        lines = http_block.decode('latin-1').split("\r\n")
+        _, status, reason = (lines[0].split(' ', 2) + [''])[:3]
+        headers = CaseInsensitiveDict()
+        for line in lines[1:]:
+            name, _, value = line.partition(': ')
+            headers[name] = value
+        return int(status), reason, headers, body
+
+class RecordingAdapter(HTTPAdapter):
+    """Transport adapter that appends every response it receives to an archive"""
+
+    def __init__(self, archive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        self.archive.append(request.url, response.status_code, response.reason, response.headers, response.content)
+        return response
+
+class ReplayAdapter(HTTPAdapter):
+    """Transport adapter that answers requests from an archive, never the network"""
+
+    def __init__(self, archive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    def send(self, request, **kwargs):
+        found = self.archive.lookup(request.url)
+        if found is None:
+            logger.debug(f"{request.url} is not in the replay archive")
+            found = (404, 'Not In Archive', CaseInsensitiveDict({'Content-Length': '0'}), b'')
+        status, reason, headers, body = found
+        # The stored body is already decoded, so drop transfer-level encodings
+        headers.pop('Content-Encoding', None)
+        headers.pop('Transfer-Encoding', None)
+
+        response = requests.Response()
+        response.status_code = status
+        response.reason = reason
+        response.headers = headers
+        response._content = body
+        response.url = request.url
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(headers)
+        response.connection = self
+        return response
+
+def open_archive(record_path=None, replay_path=None):
+    """Build an archive from --record/--replay style options, or None if neither is set"""
+    if record_path and replay_path:
+        raise ValueError("Use either record or replay, not both")
+    if replay_path:
+        return ResponseArchive(replay_path, mode='replay')
+    if record_path:
+        return ResponseArchive(record_path, mode='record')
+    return None
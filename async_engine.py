@@ -0,0 +1,121 @@
+import asyncio
+import random
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+class AsyncFetchEngine:
+    """Fetch many URLs concurrently with a bounded number of requests per host.
+
+    `fetch` is any blocking callable taking a URL and returning the page text
+    (or None on failure). It runs on a worker thread so the event loop can keep
+    several requests in flight. Each in-flight slot waits a random delay from
+    the configured window before its request, so `per_host=1` behaves exactly
+    like the serial scraper.
+
+    `cached`, if given, is called with the URL before waiting for a slot; a
+    non-None result is returned straight away without any delay. `rate`, an
+    AdaptiveRateController, replaces the fixed random delay with the host's
+    adaptive rate shared by all slots.
+    """
+
+    def __init__(self, fetch, per_host=4, delay_min=0.5, delay_max=1.0, max_workers=None, cached=None, rate=None):
+        self.fetch_func = fetch
+        self.cached_func = cached
+        self.rate = rate
+        self.per_host = max(1, int(per_host))
+        self.delay_min = delay_min
+        self.delay_max = delay_max
+        self.max_workers = max_workers or self.per_host * 4
+        self._executor = None
+        self._semaphores = {}
+
+    @classmethod
+    def from_config(cls, fetch, config, per_host=None, cached=None, rate=None):
+        """Build an engine from a scraper config's rate_limiting/concurrency blocks"""
+        rate_limiting = config.get("rate_limiting", {})
+        concurrency = config.get("concurrency", {})
+        return cls(
+            fetch,
+            per_host=per_host or concurrency.get("per_host", 4),
+            delay_min=rate_limiting.get("delay_min", 0.5),
+            delay_max=rate_limiting.get("delay_max", 1.0),
+            max_workers=concurrency.get("max_workers"),
+            cached=cached,
+            rate=rate,
+        )
+
+    def _semaphore(self, url):
+        host = urlparse(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host)
+        return self._semaphores[host]
+
+    async def fetch(self, url):
+        """Fetch a single URL, waiting for a free slot on its host"""
+        if self.cached_func:
+            text = self.cached_func(url)
+            if text is not None:
+                return text
+        async with self._semaphore(url):
+            if self.rate:
+                delay = self.rate.reserve(url)
+            else:
+                delay = random.uniform(self.delay_min, self.delay_max)
+            await asyncio.sleep(delay)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self.fetch_func, url)
+
+    async def gather(self, urls):
+        """Fetch all URLs concurrently, returning results in input order"""
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
+
+    async def prefetch(self, urls, window=None):
+        """Yield fetched pages in input order, keeping up to `window` fetches ahead.
+
+        Closing the generator (e.g. via contextlib.aclosing after a `break`)
+        cancels every fetch that has not been consumed yet. Requests already
+        handed to a worker thread finish in the background and are discarded.
+        """
+        window = max(1, window or self.per_host)
+        url_iter = iter(urls)
+        pending = deque()
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < window:
+                    url = next(url_iter, None)
+                    if url is None:
+                        exhausted = True
+                        break
+                    pending.append(asyncio.ensure_future(self.fetch(url)))
+                if not pending:
+                    return
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                logger.debug(f"Cancelled {len(pending)} speculative fetches")
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def run(self, coro):
+        """Run a coroutine on a fresh event loop backed by this engine's thread pool"""
+        self._semaphores = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            self._executor = executor
+            try:
+                return asyncio.run(coro)
+            finally:
+                self._executor = None
+
+    def fetch_all(self, urls):
+        """Blocking helper: fetch a list of URLs and return their texts in order"""
+        urls = list(urls)
+        if not urls:
+            return []
+        logger.debug(f"Fetching {len(urls)} URLs with {self.per_host} slots per host")
+        return self.run(self.gather(urls))
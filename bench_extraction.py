@@ -0,0 +1,60 @@
+import argparse
+import time
+
+from universal_scraper import UniversalScraper
+from parser_backend import make_soup
+
+def build_page(items):
+    """Build a synthetic listing page matching the default config's selectors"""
+    cards = ''.join(
+        f'<div class="listing-item"><h2>Job {i}</h2><span class="company">Company {i}</span>'
+        f'<span class="location">City {i % 50}</span><p class="summary">Description for job {i}</p>'
+        f'<a href="/jobs/{i}">View</a><span class="posted">{i % 30} days ago</span></div>'
+        for i in range(items)
+    )
+    return f'<html><body><nav><a href="/">Home</a></nav><main>{cards}</main></body></html>'
+
+def interpreted(scraper, elements):
+    """Legacy path: read the field config and parse each selector per element"""
+    fields = scraper.config["fields"]
+    return [
+        {name: scraper.extract_field_value(element, field_config) for name, field_config in fields.items()}
+        for element in elements
+    ]
+
+def compiled(scraper, elements):
+    """Compiled extraction plan built once at load time"""
+    extract = scraper.plan.extract
+    return [extract(element) for element in elements]
+
+def best_of(func, scraper, elements, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(scraper, elements)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-item field extraction')
+    parser.add_argument('--items', type=int, default=5000, help='Items on the synthetic page')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per variant (best is reported)')
+    args = parser.parse_args()
+
+    scraper = UniversalScraper()
+    scraper.config["base_url"] = "https://example.com"
+    scraper.plan = scraper.plan.from_config(scraper.config)
+    soup = make_soup(build_page(args.items))
+    elements = soup.select(scraper.config["item_selector"])
+
+    old_time, old_result = best_of(interpreted, scraper, elements, args.repeat)
+    new_time, new_result = best_of(compiled, scraper, elements, args.repeat)
+    assert old_result == new_result, "compiled plan produced different records"
+
+    print(f"Items: {len(elements)}")
+    print(f"Interpreted: {old_time * 1e6 / len(elements):8.1f} us/item")
+    print(f"Compiled:    {new_time * 1e6 / len(elements):8.1f} us/item")
+    print(f"Speedup:     {old_time / new_time:8.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,61 @@
-import requests
-from bs4 import BeautifulSoup
 import csv
-import time
-import random
 import json
 import logging
-from urllib.parse import urljoin, urlparse
 import re
+import argparse
+
+from response_cache import ResponseCache
+from archive import open_archive
+from rate_control import AdaptiveRateController
+from retry import FetchError
+from transport import Transport
+from parser_backend import make_soup, BACKENDS
+from card_extractor import CardExtractor, CardField
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Fields in output order; each card is walked once for all of them
+TECHNOLOGY_CARD = CardExtractor([
+    CardField('technology_name', ['h2', 'h3', 'h4'], r'title|name|tech'),
+    CardField('category', ['span', 'div'], r'category|type|tech-type'),
+    CardField('description', ['p', 'div'], r'description|summary|details'),
+    CardField('usage_stats', ['span', 'div'], r'usage|percentage|stats'),
+    CardField('link', 'a', base_url="https://builtwith.com"),
+])
+
+WEBSITE_CARD = CardExtractor([
+    CardField('website_url', ['h3', 'h4', 'a'], r'url|site|website'),
+    CardField('technologies', ['div', 'span'], r'tech|technology'),
+    CardField('traffic_rank', ['span', 'div'], r'rank|traffic|alexa'),
+    CardField('country', ['span', 'div'], r'country|location'),
+    CardField('link', 'a', base_url="https://builtwith.com"),
+])
+
 class BuiltWithScraper:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
+    def __init__(self, parser=None, sink=None, cache=None, archive=None):
+        self.parser = parser
+        self.cache = cache
+        self.archive = archive
+        self.sink = sink
+        self.transport = Transport(
+            headers={'Upgrade-Insecure-Requests': '1'},
+            cache=cache,
+            archive=archive,
+            # BuiltWith is sensitive to scraping, so use longer delays
+            rate_controller=AdaptiveRateController(min_delay=3.0, max_delay=5.0),
+        )
+        self.session = self.transport.session
         self.data = []
+        self.item_count = 0
         self.max_items = 5000
         
     def get_page(self, url):
         """Get a page with error handling and rate limiting"""
         try:
-            # BuiltWith is sensitive to scraping, so use longer delays
-            time.sleep(random.uniform(3.0, 5.0))
-            
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
+            return self.transport.get(url)
+        except FetchError as e:
             logger.error(f"Error fetching {url}: {e}")
             return None
     
@@ -51,19 +71,21 @@ class BuiltWithScraper:
         if not html_content:
             return []
         
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = make_soup(html_content, self.parser)
         
         # Look for technology cards/items
         tech_items = soup.find_all(['div', 'article'], class_=re.compile(r'tech|technology|card|item'))
         
+        records = []
         for item in tech_items:
-            if len(self.data) >= self.max_items:
+            if self.item_count + len(records) >= self.max_items:
                 break
                 
             tech_data = self.extract_technology_data(item)
             if tech_data:
-                self.data.append(tech_data)
+                records.append(tech_data)
         
+        self.emit(records)
         return self.data
     
     def scrape_recent_websites(self):
@@ -75,19 +97,21 @@ class BuiltWithScraper:
         if not html_content:
             return []
         
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = make_soup(html_content, self.parser)
         
         # Look for website cards/items
         site_items = soup.find_all(['div', 'article'], class_=re.compile(r'site|website|card|item'))
         
+        records = []
         for item in site_items:
-            if len(self.data) >= self.max_items:
+            if self.item_count + len(records) >= self.max_items:
                 break
                 
             site_data = self.extract_website_data(item)
             if site_data:
-                self.data.append(site_data)
+                records.append(site_data)
         
+        self.emit(records)
         return self.data
     
     def scrape_technology_details(self, tech_url):
@@ -98,7 +122,7 @@ class BuiltWithScraper:
         if not html_content:
             return None
         
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = make_soup(html_content, self.parser)
         
         # Extract detailed technology information
         tech_data = {
@@ -116,33 +140,7 @@ class BuiltWithScraper:
     def extract_technology_data(self, item):
         """Extract technology data from an item element"""
         try:
-            # Find technology name
-            name_elem = item.find(['h2', 'h3', 'h4'], class_=re.compile(r'title|name|tech'))
-            name = name_elem.get_text(strip=True) if name_elem else "N/A"
-            
-            # Find link
-            link_elem = item.find('a')
-            link = urljoin("https://builtwith.com", link_elem.get('href')) if link_elem else "N/A"
-            
-            # Find description
-            desc_elem = item.find(['p', 'div'], class_=re.compile(r'description|summary|details'))
-            description = desc_elem.get_text(strip=True) if desc_elem else "N/A"
-            
-            # Find category
-            cat_elem = item.find(['span', 'div'], class_=re.compile(r'category|type|tech-type'))
-            category = cat_elem.get_text(strip=True) if cat_elem else "N/A"
-            
-            # Find usage stats
-            usage_elem = item.find(['span', 'div'], class_=re.compile(r'usage|percentage|stats'))
-            usage = usage_elem.get_text(strip=True) if usage_elem else "N/A"
-            
-            return {
-                'technology_name': name,
-                'category': category,
-                'description': description,
-                'usage_stats': usage,
-                'link': link
-            }
+            return TECHNOLOGY_CARD.extract(item)
         except Exception as e:
             logger.error(f"Error extracting technology data: {e}")
             return None
@@ -150,33 +148,7 @@ class BuiltWithScraper:
     def extract_website_data(self, item):
         """Extract website data from an item element"""
         try:
-            # Find website URL
-            url_elem = item.find(['h3', 'h4', 'a'], class_=re.compile(r'url|site|website'))
-            website_url = url_elem.get_text(strip=True) if url_elem else "N/A"
-            
-            # Find technologies
-            tech_elem = item.find(['div', 'span'], class_=re.compile(r'tech|technology'))
-            technologies = tech_elem.get_text(strip=True) if tech_elem else "N/A"
-            
-            # Find traffic rank
-            rank_elem = item.find(['span', 'div'], class_=re.compile(r'rank|traffic|alexa'))
-            traffic_rank = rank_elem.get_text(strip=True) if rank_elem else "N/A"
-            
-            # Find country
-            country_elem = item.find(['span', 'div'], class_=re.compile(r'country|location'))
-            country = country_elem.get_text(strip=True) if country_elem else "N/A"
-            
-            # Find link
-            link_elem = item.find('a')
-            link = urljoin("https://builtwith.com", link_elem.get('href')) if link_elem else "N/A"
-            
-            return {
-                'website_url': website_url,
-                'technologies': technologies,
-                'traffic_rank': traffic_rank,
-                'country': country,
-                'link': link
-            }
+            return WEBSITE_CARD.extract(item)
         except Exception as e:
             logger.error(f"Error extracting website data: {e}")
             return None
@@ -189,6 +161,14 @@ class BuiltWithScraper:
                 return elem.get_text(strip=True)
         return "N/A"
     
+    def emit(self, records):
+        """Stream records to the sink, or keep them in memory without one"""
+        self.item_count += len(records)
+        if self.sink:
+            self.sink.write_many(records)
+        else:
+            self.data.extend(records)
+    
     def save_to_csv(self, filename='builtwith_data.csv'):
         """Save scraped data to CSV file"""
         if not self.data:
@@ -216,7 +196,18 @@ class BuiltWithScraper:
         logger.info(f"Saved {len(self.data)} items to {filename}")
 
 def main():
-    scraper = BuiltWithScraper()
+    parser = argparse.ArgumentParser(description='BuiltWith Scraper')
+    parser.add_argument('--parser', choices=['auto'] + list(BACKENDS), default='auto', help='HTML parser backend')
+    parser.add_argument('--cache', action='store_true', help='Cache responses on disk between runs')
+    parser.add_argument('--record', metavar='ARCHIVE', help='Record every response to an archive')
+    parser.add_argument('--replay', metavar='ARCHIVE', help='Serve responses from an archive instead of the network')
+    args = parser.parse_args()
+    
+    scraper = BuiltWithScraper(
+        parser=args.parser,
+        cache=ResponseCache() if args.cache else None,
+        archive=open_archive(args.record, args.replay),
+    )
     
     print("BuiltWith Scraper")
     print("1. Scrape Technology Directory")
@@ -0,0 +1,83 @@
+import re
+from urllib.parse import urljoin
+
+from bs4 import Tag
+
+class CardField:
+    """One field of a card: the first descendant with one of `tags` whose class matches `pattern`.
+
+    Without a pattern the first descendant with one of `tags` is used. The
+    value is the element's stripped text, or with `base_url` its href
+    resolved against that URL. `default` is used when nothing matches.
+    """
+
+    def __init__(self, name, tags, pattern=None, default="N/A", base_url=None):
+        self.name = name
+        self.tags = frozenset([tags] if isinstance(tags, str) else tags)
+        self.pattern = re.compile(pattern) if pattern else None
+        self.default = default
+        self.base_url = base_url
+        # Class tokens repeat from card to card, so remember each one's verdict
+        self._token_matches = {}
+
+    def matches_token(self, token):
+        matched = self._token_matches.get(token)
+        if matched is None:
+            if len(self._token_matches) > 10000:
+                self._token_matches.clear()
+            matched = self._token_matches[token] = bool(self.pattern.search(token))
+        return matched
+
+    def value(self, element):
+        if element is None:
+            return self.default
+        if self.base_url is not None:
+            return urljoin(self.base_url, element.get('href'))
+        return element.get_text(strip=True)
+
+class CardExtractor:
+    """Extract many regex-matched fields from a card with one walk of its subtree.
+
+    The walk indexes every descendant by class token and by tag name, keeping
+    document order. Each field is then resolved from the index: the earliest
+    element with a matching class token and an allowed tag. This gives the
+    same result as one `item.find(tags, class_=re.compile(pattern))` per
+    field, as long as patterns do not span the space between class names.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def index(self, item):
+        """Map class tokens and tag names to (position, element) lists in document order"""
+        by_class = {}
+        by_name = {}
+        for position, element in enumerate(item.descendants):
+            if not isinstance(element, Tag):
+                continue
+            by_name.setdefault(element.name, []).append((position, element))
+            classes = element.get('class') or ()
+            if isinstance(classes, str):
+                classes = classes.split()
+            for token in classes:
+                by_class.setdefault(token, []).append((position, element))
+        return by_class, by_name
+
+    def find(self, field, by_class, by_name):
+        """The element a field resolves to, or None"""
+        if field.pattern is None:
+            candidates = [entries[0] for name, entries in by_name.items() if name in field.tags]
+        else:
+            candidates = []
+            for token, entries in by_class.items():
+                if field.matches_token(token):
+                    for entry in entries:
+                        if entry[1].name in field.tags:
+                            candidates.append(entry)
+                            break
+        return min(candidates, key=lambda entry: entry[0])[1] if candidates else None
+
+    def extract(self, item):
+        """Extract every field from a card into a dict, in field order"""
+        by_class, by_name = self.index(item)
+        return {field.name: field.value(self.find(field, by_class, by_name)) for field in self.fields}
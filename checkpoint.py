@@ -0,0 +1,48 @@
+import json
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+class Checkpoint:
+    """Crawl progress persisted to a small JSON file.
+
+    Every save writes a temporary file next to the checkpoint and renames
+    it into place, so a crash mid-write leaves the previous state intact.
+    """
+
+    def __init__(self, path, state=None):
+        self.path = path
+        self.state = state or {}
+
+    @classmethod
+    def load(cls, path):
+        """Load an existing checkpoint, or return None if there is none"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(path, json.load(f))
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading checkpoint {path}: {e}")
+            return None
+
+    def get(self, key, default=None):
+        return self.state.get(key, default)
+
+    def save(self, **state):
+        """Merge the given values into the checkpoint and write it atomically"""
+        self.state.update(state)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.checkpoint-', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
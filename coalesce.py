@@ -0,0 +1,92 @@
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+
+from frontier import normalize_url
+
+logger = logging.getLogger(__name__)
+
+class RequestCoalescer:
+    """Fetch each URL once for all the callers that ask for it at about the same time.
+
+    Callers asking for a URL that is already being fetched wait on the same
+    future instead of sending another request. A successful page is kept for
+    `ttl` seconds after it arrives, so a URL repeated shortly afterwards is
+    answered without a new request either. Kept pages never add up to more
+    than `max_bytes`, so memory stays flat over a long run. Failures
+    (exceptions or None) are passed to every waiter but not kept, so a later
+    call can try again.
+    """
+
+    def __init__(self, ttl=60.0, max_bytes=8 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.coalesced = 0
+        self._inflight = {}
+        # key -> (expiry, size, future), oldest first
+        self._completed = OrderedDict()
+        self._completed_bytes = 0
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        """Drop kept pages past their ttl, and the oldest ones while over max_bytes"""
+        while self._completed:
+            expires, size, _ = next(iter(self._completed.values()))
+            if expires > now and self._completed_bytes <= self.max_bytes:
+                break
+            self._completed.popitem(last=False)
+            self._completed_bytes -= size
+
+    def call(self, url, fetch):
+        """Return fetch(url), sharing one call among identical URLs"""
+        key = normalize_url(url)
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._completed.get(key)
+            if entry is not None:
+                future = entry[2]
+            else:
+                future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+                logger.debug(f"Reusing the response for {url}")
+        if not owner:
+            return future.result()
+
+        try:
+            result = fetch(url)
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            size = len(result) if isinstance(result, (str, bytes)) else None
+            if size is not None and self.ttl and size <= self.max_bytes:
+                previous = self._completed.pop(key, None)
+                if previous:
+                    self._completed_bytes -= previous[1]
+                self._completed[key] = (time.monotonic() + self.ttl, size, future)
+                self._completed_bytes += size
+                self._expire(time.monotonic())
+        future.set_result(result)
+        return result
+
+    def log_stats(self):
+        if self.coalesced:
+            logger.info(f"Skipped {self.coalesced} duplicate requests")
+
+def dedupe(items, label='items'):
+    """Drop repeated entries from a list, keeping first occurrences, and report them"""
+    counts = Counter(items)
+    duplicates = {item: count - 1 for item, count in counts.items() if count > 1}
+    if duplicates:
+        details = ', '.join(f"{item} x{count}" for item, count in duplicates.items())
+        logger.warning(f"Removed {sum(duplicates.values())} duplicate {label}: {details}")
+    return list(dict.fromkeys(items))
@@ -1,35 +1,167 @@
-import requests
-from bs4 import BeautifulSoup
 import csv
 import json
-import time
-import random
 import logging
 import re
+import argparse
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from response_cache import ResponseCache
+from archive import open_archive
+from rate_control import AdaptiveRateController
+from retry import FetchError, ErrorBudgetExceeded, NOT_FOUND
+from transport import Transport
+from coalesce import dedupe
+from dedup import Deduplicator
+from parser_backend import make_soup, BACKENDS
+from sinks import open_sink, SINKS
+from structured_data import StructuredExtractor, StructuredField
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# App page URL for each store, filled in with an app id
+APP_STORES = {
+    'appstore': "https://apps.apple.com/us/app/id{}",
+    'playstore': "https://play.google.com/store/apps/details?id={}",
+}
+
+# Both stores embed a schema.org SoftwareApplication as JSON-LD on app pages
+APP_JSON_LD = StructuredExtractor([
+    StructuredField('name', 'name', default="Unknown"),
+    StructuredField('developer', 'author.name', default="Unknown"),
+    StructuredField('rating', 'aggregateRating.ratingValue'),
+], item_type='SoftwareApplication')
+
 class ComprehensiveAppScraper:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-        })
+    def __init__(self, parser=None, cache=None, archive=None, delay=1):
+        self.parser = parser
+        self.cache = cache
+        self.archive = archive
         self.apps = []
-        self.delay = 1
+        # Apps are listed once per name and developer, whichever source finds them first
+        self.unique = Deduplicator(['name', 'developer'], mode='memory')
+        self.duplicate_ids = 0
+        self._ids_lock = threading.Lock()
+        self.delay = delay
+        self.transport = Transport(
+            timeout=(5, 10),
+            cache=cache,
+            archive=archive,
+            rate_controller=AdaptiveRateController(min_delay=self.delay, max_delay=self.delay + 0.5),
+        )
+        self.session = self.transport.session
 
     def get_page(self, url):
         try:
-            time.sleep(random.uniform(self.delay, self.delay + 0.5))
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
+            return self.transport.get(url)
+        except FetchError as e:
             logging.error(f"Error fetching {url}: {e}")
             return None
 
+    def iter_app_ids(self, path, only=None):
+        """Stream (store, app id) pairs from a file with one id per line, skipping duplicates.
+        
+        Numeric ids (optionally written id123) are App Store apps and package
+        names such as com.spotify.music are Google Play apps. A line can also
+        name its store as appstore:<id> or playstore:<id>. Blank lines and
+        # comments are ignored. With `only`, just that store's ids are read,
+        and lines naming an unknown store are left for the first store's
+        reader to report.
+        """
+        seen = set()
+        report = only is None or only == next(iter(APP_STORES))
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_num, line in enumerate(f, 1):
+                line = line.split('#', 1)[0].strip()
+                if not line:
+                    continue
+                store, _, app_id = line.rpartition(':')
+                app_id = re.sub(r'^id(?=\d+$)', '', app_id.strip())
+                store = store.strip().lower() or ('appstore' if app_id.isdigit() else 'playstore')
+                if store not in APP_STORES:
+                    if report:
+                        logging.warning(f"Skipping line {line_num}: unknown store '{store}'")
+                    continue
+                if only and store != only:
+                    continue
+                if (store, app_id) in seen:
+                    with self._ids_lock:
+                        self.duplicate_ids += 1
+                    continue
+                seen.add((store, app_id))
+                yield store, app_id
+
+    def fetch_app(self, store, app_id):
+        """Fetch and parse one app page, returning its record or None"""
+        url = APP_STORES[store].format(app_id)
+        try:
+            html = self.transport.get(url)
+        except FetchError as e:
+            if e.kind == NOT_FOUND:
+                logging.info(f"No {store} app with id {app_id}")
+            else:
+                logging.error(f"Error fetching {url}: {e}")
+            return None
+        parse = self.parse_appstore_app if store == 'appstore' else self.parse_playstore_app
+        app = parse(html)
+        return dict(app_id=app_id, **app) if app else None
+
+    def scrape_id_file(self, path, sink, workers=4):
+        """Fetch every app in an id file, streaming records to a sink as they arrive.
+        
+        Each store has its own feeder thread reading the file for that store's
+        ids, and its own pool of `workers` threads with at most twice that many
+        apps in flight. A slow store only holds up its own feeder, never the
+        other store's. Requests to each store are paced by that store's
+        adaptive rate limit.
+        """
+        pools = {store: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=store) for store in APP_STORES}
+        lock = threading.Lock()
+        stop = threading.Event()
+        found = missing = 0
+        self.duplicate_ids = 0
+        
+        def collect(done):
+            nonlocal found, missing
+            apps = [future.result() for future in done]
+            records = [app for app in apps if app]
+            with lock:
+                if records:
+                    sink.write_many(records)
+                    if found // 500 != (found + len(records)) // 500:
+                        logging.info(f"Scraped {found + len(records)} apps so far")
+                found += len(records)
+                missing += len(apps) - len(records)
+        
+        def feed(store):
+            pending = set()
+            try:
+                for _, app_id in self.iter_app_ids(path, only=store):
+                    if stop.is_set():
+                        break
+                    pending.add(pools[store].submit(self.fetch_app, store, app_id))
+                    if len(pending) >= workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                done, _ = wait(pending)
+                collect(done)
+            except BaseException:
+                # Stop the other store's feeder too, e.g. when the error budget runs out
+                stop.set()
+                raise
+        
+        try:
+            with ThreadPoolExecutor(max_workers=len(APP_STORES), thread_name_prefix='feed') as feeders:
+                for feeder in [feeders.submit(feed, store) for store in APP_STORES]:
+                    feeder.result()
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True, cancel_futures=True)
+        
+        logging.info(f"Scraped {found} apps; {missing} not found or unparseable, {self.duplicate_ids} duplicate ids skipped")
+        return found
+
     def scrape_appstore_comprehensive(self):
         """Scrape comprehensive list from Apple App Store"""
         logging.info("Scraping comprehensive Apple App Store apps...")
@@ -58,37 +190,46 @@ class ComprehensiveAppScraper:
             "284882215",  # Facebook
         ]
         
-        for app_id in app_ids:
-            url = f"https://apps.apple.com/us/app/id{app_id}"
-            html = self.get_page(url)
+        for app_id in dedupe(app_ids, 'App Store ids'):
+            html = self.get_page(APP_STORES['appstore'].format(app_id))
             if html:
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                try:
-                    # Extract app name
-                    name_elem = soup.find('h1', {'class': 'product-header__title'})
-                    name = name_elem.get_text(strip=True) if name_elem else "Unknown"
-                    
-                    # Extract developer
-                    dev_elem = soup.find('a', {'class': 'link'})
-                    developer = dev_elem.get_text(strip=True) if dev_elem else "Unknown"
-                    
-                    # Extract rating
-                    rating_elem = soup.find('span', {'class': 'we-rating-count'})
-                    rating = rating_elem.get_text(strip=True) if rating_elem else "N/A"
-                    
-                    if name != "Unknown":
-                        self.apps.append({
-                            'name': name,
-                            'developer': developer,
-                            'rating': rating,
-                            'store': 'Apple App Store'
-                        })
-                        logging.info(f"Found: {name} by {developer}")
-                
-                except Exception as e:
-                    logging.error(f"Error parsing app page: {e}")
-                    continue
+                app = self.parse_appstore_app(html)
+                if app:
+                    self.add_app(app)
+                    logging.info(f"Found: {app['name']} by {app['developer']}")
+
+    def parse_appstore_app(self, html):
+        """Parse an App Store app page into a record, or None if it has no app name"""
+        app = APP_JSON_LD.extract_one(html)
+        if app and app['name'] != "Unknown":
+            app['store'] = 'Apple App Store'
+            return app
+        
+        soup = make_soup(html, self.parser)
+        try:
+            # Extract app name
+            name_elem = soup.find('h1', {'class': 'product-header__title'})
+            name = name_elem.get_text(strip=True) if name_elem else "Unknown"
+            
+            # Extract developer
+            dev_elem = soup.find('a', {'class': 'link'})
+            developer = dev_elem.get_text(strip=True) if dev_elem else "Unknown"
+            
+            # Extract rating
+            rating_elem = soup.find('span', {'class': 'we-rating-count'})
+            rating = rating_elem.get_text(strip=True) if rating_elem else "N/A"
+        except Exception as e:
+            logging.error(f"Error parsing app page: {e}")
+            return None
+        
+        if name == "Unknown":
+            return None
+        return {
+            'name': name,
+            'developer': developer,
+            'rating': rating,
+            'store': 'Apple App Store'
+        }
 
     def scrape_google_play_comprehensive(self):
         """Scrape comprehensive list from Google Play Store"""
@@ -108,37 +249,46 @@ class ComprehensiveAppScraper:
             "com.discord",               # Discord
         ]
         
-        for app_id in app_ids:
-            url = f"https://play.google.com/store/apps/details?id={app_id}"
-            html = self.get_page(url)
+        for app_id in dedupe(app_ids, 'Google Play ids'):
+            html = self.get_page(APP_STORES['playstore'].format(app_id))
             if html:
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                try:
-                    # Extract app name
-                    name_elem = soup.find('h1', {'class': 'AHFaub'})
-                    name = name_elem.get_text(strip=True) if name_elem else "Unknown"
-                    
-                    # Extract developer
-                    dev_elem = soup.find('a', {'class': 'hrTbp'})
-                    developer = dev_elem.get_text(strip=True) if dev_elem else "Unknown"
-                    
-                    # Extract rating
-                    rating_elem = soup.find('div', {'class': 'BHMmbe'})
-                    rating = rating_elem.get_text(strip=True) if rating_elem else "N/A"
-                    
-                    if name != "Unknown":
-                        self.apps.append({
-                            'name': name,
-                            'developer': developer,
-                            'rating': rating,
-                            'store': 'Google Play'
-                        })
-                        logging.info(f"Found: {name} by {developer}")
-                
-                except Exception as e:
-                    logging.error(f"Error parsing Google Play app: {e}")
-                    continue
+                app = self.parse_playstore_app(html)
+                if app:
+                    self.add_app(app)
+                    logging.info(f"Found: {app['name']} by {app['developer']}")
+
+    def parse_playstore_app(self, html):
+        """Parse a Google Play app page into a record, or None if it has no app name"""
+        app = APP_JSON_LD.extract_one(html)
+        if app and app['name'] != "Unknown":
+            app['store'] = 'Google Play'
+            return app
+        
+        soup = make_soup(html, self.parser)
+        try:
+            # Extract app name
+            name_elem = soup.find('h1', {'class': 'AHFaub'})
+            name = name_elem.get_text(strip=True) if name_elem else "Unknown"
+            
+            # Extract developer
+            dev_elem = soup.find('a', {'class': 'hrTbp'})
+            developer = dev_elem.get_text(strip=True) if dev_elem else "Unknown"
+            
+            # Extract rating
+            rating_elem = soup.find('div', {'class': 'BHMmbe'})
+            rating = rating_elem.get_text(strip=True) if rating_elem else "N/A"
+        except Exception as e:
+            logging.error(f"Error parsing Google Play app: {e}")
+            return None
+        
+        if name == "Unknown":
+            return None
+        return {
+            'name': name,
+            'developer': developer,
+            'rating': rating,
+            'store': 'Google Play'
+        }
 
     def scrape_from_alternative_sources(self):
         """Scrape from alternative sources"""
@@ -156,7 +306,7 @@ class ComprehensiveAppScraper:
         for source in sources:
             html = self.get_page(source['url'])
             if html:
-                soup = BeautifulSoup(html, 'html.parser')
+                soup = make_soup(html, self.parser)
                 
                 # Look for app-related content
                 app_elements = soup.select(source['name_selector'])
@@ -164,7 +314,7 @@ class ComprehensiveAppScraper:
                 for elem in app_elements[:10]:
                     name = elem.get_text(strip=True)
                     if len(name) > 3 and len(name) < 100 and 'app' in name.lower():
-                        self.apps.append({
+                        self.add_app({
                             'name': name,
                             'developer': 'Apple Inc.',
                             'rating': 'N/A',
@@ -218,9 +368,14 @@ class ComprehensiveAppScraper:
         ]
         
         for app in additional_apps:
-            self.apps.append(app)
+            self.add_app(app)
             logging.info(f"Added: {app['name']} by {app['developer']}")
 
+    def add_app(self, app):
+        """Keep an app unless one with the same name and developer was already found"""
+        if self.unique.is_new(app):
+            self.apps.append(app)
+
     def save_to_csv(self, filename='comprehensive_apps.csv'):
         with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
             fieldnames = ['name', 'developer', 'rating', 'store']
@@ -244,16 +399,7 @@ class ComprehensiveAppScraper:
         self.scrape_from_alternative_sources()
         self.generate_additional_apps()
         
-        # Remove duplicates
-        unique_apps = []
-        seen = set()
-        for app in self.apps:
-            key = f"{app['name']}-{app['developer']}"
-            if key not in seen:
-                unique_apps.append(app)
-                seen.add(key)
-        
-        self.apps = unique_apps
+        self.unique.log_stats()
         logging.info(f"Total unique apps found: {len(self.apps)}")
         
         if self.apps:
@@ -267,8 +413,34 @@ class ComprehensiveAppScraper:
             logging.warning("No apps were scraped.")
 
 def main():
-    scraper = ComprehensiveAppScraper()
-    scraper.scrape_all()
+    parser = argparse.ArgumentParser(description='Comprehensive App Scraper')
+    parser.add_argument('--parser', choices=['auto'] + list(BACKENDS), default='auto', help='HTML parser backend')
+    parser.add_argument('--cache', action='store_true', help='Cache responses on disk between runs')
+    parser.add_argument('--record', metavar='ARCHIVE', help='Record every response to an archive')
+    parser.add_argument('--replay', metavar='ARCHIVE', help='Serve responses from an archive instead of the network')
+    parser.add_argument('--ids', metavar='FILE', help='Scrape the app ids listed in a file instead of the built-in list')
+    parser.add_argument('--output', '-o', default='comprehensive_apps.csv', help='Output file (with --ids)')
+    parser.add_argument('--format', '-f', choices=list(SINKS), help='Output format (with --ids, default from the extension)')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent requests per store (with --ids)')
+    parser.add_argument('--delay', type=float, default=1.0, help='Minimum seconds between requests to each store')
+    args = parser.parse_args()
+    
+    scraper = ComprehensiveAppScraper(
+        parser=args.parser,
+        cache=ResponseCache() if args.cache else None,
+        archive=open_archive(args.record, args.replay),
+        delay=args.delay,
+    )
+    if args.ids:
+        try:
+            with open_sink(args.output, args.format) as sink:
+                scraper.scrape_id_file(args.ids, sink, workers=args.workers)
+        except ErrorBudgetExceeded as e:
+            logging.error(f"Aborting: {e}")
+            sys.exit(1)
+    else:
+        scraper.scrape_all()
+    scraper.transport.coalescer.log_stats()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
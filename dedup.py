@@ -0,0 +1,205 @@
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+MODES = ('auto', 'memory', 'disk', 'bloom')
+
+# Values a scraper stores for a field it could not extract
+MISSING = (None, '', 'N/A')
+
+def default_key_fields(fields):
+    """Identify records by their link when they have one, else by every field"""
+    fields = list(fields)
+    return ["link"] if "link" in fields else fields
+
+def has_key(record, key_fields):
+    """True if any key field was extracted; records with none cannot be told apart by key"""
+    return any(record.get(field) not in MISSING for field in key_fields)
+
+def record_key(record, key_fields):
+    """16-byte digest of a record's key fields"""
+    values = '\x1f'.join('' if record.get(field) is None else str(record[field]) for field in key_fields)
+    return hashlib.blake2b(values.encode('utf-8'), digest_size=16).digest()
+
+class MemoryKeys:
+    """Exact set of keys in memory"""
+
+    def __init__(self):
+        self.keys = set()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key):
+        """Add a key, returning True if it was not there yet"""
+        if key in self.keys:
+            return False
+        self.keys.add(key)
+        return True
+
+    def close(self):
+        self.keys.clear()
+
+class DiskKeys:
+    """Exact set of keys in a SQLite file, for runs too large to keep in memory.
+
+    Without a path the file is temporary and deleted on close. A named file
+    is kept, so the next run also skips the keys this one saw.
+    """
+
+    def __init__(self, path=None):
+        self.temporary = path is None
+        if self.temporary:
+            fd, path = tempfile.mkstemp(prefix='dedup-', suffix='.sqlite')
+            os.close(fd)
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=OFF' if self.temporary else 'PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS keys (key BLOB PRIMARY KEY) WITHOUT ROWID')
+        self.count = self._db.execute('SELECT COUNT(*) FROM keys').fetchone()[0]
+
+    def __len__(self):
+        return self.count
+
+    def add(self, key):
+        added = self._db.execute('INSERT OR IGNORE INTO keys (key) VALUES (?)', (key,)).rowcount == 1
+        self.count += added
+        return added
+
+    def add_many(self, keys):
+        with self._db:
+            self._db.executemany('INSERT OR IGNORE INTO keys (key) VALUES (?)', ((key,) for key in keys))
+        self.count = self._db.execute('SELECT COUNT(*) FROM keys').fetchone()[0]
+
+    def commit(self):
+        self._db.commit()
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+        if self.temporary:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(self.path + suffix):
+                    os.remove(self.path + suffix)
+
+class BloomKeys:
+    """Approximate set of keys in a fixed-size Bloom filter.
+
+    Memory is fixed by `capacity` and `error_rate` (about 1.8 MB per million
+    keys at 0.1%). A duplicate is never let through, but up to error_rate of
+    new keys are wrongly taken for duplicates once capacity is reached.
+    """
+
+    def __init__(self, capacity=10_000_000, error_rate=0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, key):
+        first = int.from_bytes(key[:8], 'big')
+        second = int.from_bytes(key[8:], 'big') | 1
+        added = False
+        for i in range(self.hashes):
+            position = (first + i * second) % self.size
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        self.count += added
+        if self.count == self.capacity:
+            logger.warning(f"Dedup filter is full ({self.capacity} keys), false duplicates will grow")
+        return added
+
+    def close(self):
+        self.bits = bytearray()
+
+class Deduplicator:
+    """Drop records whose key fields were already seen in this run, as they stream by.
+
+    Mode "memory" keeps an exact set of 16-byte key digests, about 100 MB per
+    million records. "disk" keeps them in SQLite. "auto" starts in memory and
+    moves to a temporary SQLite file after `max_memory_keys`. "bloom" uses a
+    fixed-size Bloom filter, which never lets a duplicate through but may
+    drop a few unique records. Records whose key fields are all missing
+    or "N/A" are passed through, since they would otherwise all share one key.
+    """
+
+    def __init__(self, key_fields, mode='auto', max_memory_keys=1_000_000, path=None,
+                 capacity=10_000_000, error_rate=0.001):
+        if mode not in MODES:
+            raise ValueError(f"Unknown dedup mode '{mode}', expected one of {', '.join(MODES)}")
+        self.key_fields = key_fields
+        self.mode = mode
+        self.max_memory_keys = max_memory_keys
+        self.path = path
+        self.dropped = 0
+        self.unkeyed = 0
+        if mode == 'bloom':
+            self.keys = BloomKeys(capacity, error_rate)
+        elif mode == 'disk' or path:
+            self.keys = DiskKeys(path)
+        else:
+            self.keys = MemoryKeys()
+
+    @classmethod
+    def from_config(cls, config, enabled=False):
+        """Build a deduplicator from a config's `dedup` block, or None if it is disabled"""
+        dedup = config.get("dedup", {})
+        if not (enabled or dedup.get("enabled")):
+            return None
+        return cls(
+            dedup.get("key_fields") or default_key_fields(config["fields"]),
+            mode=dedup.get("mode", "auto"),
+            max_memory_keys=dedup.get("max_memory_keys", 1_000_000),
+            path=dedup.get("path"),
+            capacity=dedup.get("capacity", 10_000_000),
+            error_rate=dedup.get("error_rate", 0.001),
+        )
+
+    def is_new(self, record):
+        """Remember a record's key, returning False if it was seen before"""
+        if not has_key(record, self.key_fields):
+            self.unkeyed += 1
+            return True
+        if self.keys.add(record_key(record, self.key_fields)):
+            if self.mode == 'auto' and isinstance(self.keys, MemoryKeys) and len(self.keys) > self.max_memory_keys:
+                self.spill()
+            return True
+        self.dropped += 1
+        return False
+
+    def filter(self, records):
+        """The records whose keys have not been seen, in order"""
+        unique = [record for record in records if self.is_new(record)]
+        if isinstance(self.keys, DiskKeys):
+            self.keys.commit()
+        return unique
+
+    def spill(self):
+        """Move the in-memory keys to a temporary SQLite file"""
+        logger.info(f"Dedup set passed {self.max_memory_keys} keys, moving it to disk")
+        keys = DiskKeys()
+        keys.add_many(self.keys.keys)
+        self.keys.close()
+        self.keys = keys
+
+    def log_stats(self):
+        if self.dropped:
+            logger.info(f"Dropped {self.dropped} duplicate records")
+        if self.unkeyed:
+            logger.info(f"Kept {self.unkeyed} records without {', '.join(self.key_fields)} undeduplicated")
+
+    def close(self):
+        self.keys.close()
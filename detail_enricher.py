@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, wait
+
+from extraction_plan import ExtractionPlan
+from frontier import Frontier, DONE, FAILED, url_key
+from parser_backend import make_soup
+
+logger = logging.getLogger(__name__)
+
+def _resolved(values):
+    future = Future()
+    future.set_result(values)
+    return future
+
+class DetailEnricher:
+    """Fetch the detail page behind each listing record and merge its fields in.
+
+    Records are submitted a page at a time. Their links go into a Frontier,
+    and `workers` threads fetch them in page order while the crawl moves on.
+    The frontier is the visited set: a link that was already fetched, in
+    this run or in the interrupted run being resumed, is answered from the
+    fields stored for it without another request. A detail page that fails
+    is queued again after `retry_delay` seconds, doubling each time, until
+    `max_attempts`. Pages are handed back complete and in submission order,
+    so output and checkpoints stay consistent. Submitting never waits. When
+    more than `max_pending` records are in flight, the caller waits with
+    `wait_for_room()` (or awaits `wait_for_room_async()` on an event loop)
+    for the oldest pages to finish.
+
+    A detail field overwrites the listing field of the same name unless it
+    came back "N/A". Every record gets every detail field, so a record whose
+    link is missing or whose detail page fails has "N/A" for the fields its
+    listing lacks, and output columns stay the same from the first record on.
+    """
+
+    def __init__(self, fetch, plan, parser=None, link_field='link', workers=4, max_pending=None, frontier=None):
+        self.fetch = fetch
+        self.plan = plan
+        self.parser = parser
+        self.link_field = link_field
+        self.workers = max(1, workers)
+        self.max_pending = max_pending or self.workers * 8
+        self.frontier = frontier or Frontier(politeness=0)
+        self.pending = 0
+        self.fetched = 0
+        self.reused = 0
+        # (page_num, records, one future per record resolving to its detail values)
+        self._pages = deque()
+        # url key -> future for links that records are waiting on
+        self._waiting = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._work, name=f'detail-{i}', daemon=True) for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @classmethod
+    def from_config(cls, config, fetch, parser=None, frontier_path=None):
+        """Build an enricher from a config's `detail` block, or None if it has none.
+
+        Links are tracked in a frontier database at frontier_path, or in
+        memory without one.
+        """
+        detail = config.get("detail")
+        if not detail or not detail.get("fields"):
+            return None
+        plan = ExtractionPlan.from_config({"base_url": config.get("base_url", ""), "fields": detail["fields"]})
+        frontier = Frontier(
+            frontier_path or ':memory:',
+            # The transport's rate limit already paces each host
+            politeness=detail.get("politeness", 0),
+            max_attempts=detail.get("max_attempts", 3),
+            retry_delay=detail.get("retry_delay", 30.0),
+        )
+        return cls(
+            fetch, plan,
+            parser=parser,
+            link_field=detail.get("link_field", "link"),
+            workers=detail.get("workers", 4),
+            max_pending=detail.get("max_pending"),
+            frontier=frontier,
+        )
+
+    def merge(self, record, values):
+        """Merge detail values into a record, filling every detail field"""
+        for field in self.plan.fields:
+            value = values.get(field.name, "N/A")
+            if value != "N/A" or field.name not in record:
+                record[field.name] = value
+        return record
+
+    def lookup(self, url, priority=0):
+        """Return a future for a link's detail values, queueing the link unless it was fetched before"""
+        if not url or url == "N/A":
+            return _resolved({})
+        key = url_key(url)
+        with self._lock:
+            future = self._waiting.get(key)
+            if future is not None:
+                self.reused += 1
+                return future
+            status = self.frontier.status(url)
+            if status and status[0] == DONE:
+                self.reused += 1
+                return _resolved(status[1] or {})
+            if status and status[0] == FAILED:
+                return _resolved({})
+            future = self._waiting[key] = Future()
+            self.frontier.add(url, priority)
+        self._wakeup.set()
+        return future
+
+    def _work(self):
+        """Worker thread: fetch links from the frontier until finish()"""
+        while not self._stop.is_set():
+            self._wakeup.clear()
+            entry = self.frontier.next()
+            if entry is None:
+                # Sleep until a link is ready or added; None means the queue is empty
+                self._wakeup.wait(self.frontier.wait_time())
+                continue
+            self._fetch(entry.url)
+
+    def _fetch(self, url):
+        """Fetch and extract one detail page, then settle its future or queue it again"""
+        try:
+            html_content = self.fetch(url)
+            values = self.plan.extract(make_soup(html_content, self.parser)) if html_content else {}
+        except Exception as e:
+            with self._lock:
+                self.frontier.failed(url)
+                future = self._waiting.pop(url_key(url), None)
+            if future is not None:
+                future.set_exception(e)
+            return
+
+        with self._lock:
+            if html_content is None:
+                if self.frontier.failed(url):
+                    logger.info(f"Queued detail page {url} again after it failed")
+                    self._wakeup.set()
+                    return
+            else:
+                # An empty page (404) is final too, its record keeps "N/A"
+                self.frontier.done(url, values)
+                self.fetched += bool(html_content)
+            future = self._waiting.pop(url_key(url), None)
+        if future is not None:
+            future.set_result(values)
+
+    def add_page(self, page_num, records):
+        """Queue a page of records without waiting and return the pages that are now complete"""
+        # Earlier pages first, so the oldest page in the queue finishes soonest
+        futures = [self.lookup(record.get(self.link_field), -page_num) for record in records]
+        self._pages.append((page_num, records, futures))
+        self.pending += len(records)
+        return self._take_ready()
+
+    @property
+    def backlogged(self):
+        return self.pending > self.max_pending
+
+    def wait_for_room(self):
+        """Block while more than max_pending records are in flight, returning the pages completed meanwhile"""
+        ready = self._take_ready()
+        while self.backlogged:
+            wait(self._pages[0][2])
+            ready.extend(self._take_ready())
+        return ready
+
+    async def wait_for_room_async(self):
+        """Like wait_for_room, but lets the event loop run while the oldest page finishes"""
+        ready = self._take_ready()
+        while self.backlogged:
+            await asyncio.wait([asyncio.wrap_future(future) for future in set(self._pages[0][2])])
+            ready.extend(self._take_ready())
+        return ready
+
+    def _take_ready(self, skip_failed=False):
+        """Pop complete pages from the front of the queue as (page_num, records)"""
+        ready = []
+        while self._pages and all(future.done() for future in self._pages[0][2]):
+            if skip_failed and any(future.exception() for future in self._pages[0][2]):
+                break
+            page_num, records, futures = self._pages.popleft()
+            self.pending -= len(records)
+            ready.append((page_num, [self.merge(record, future.result()) for record, future in zip(records, futures)]))
+        return ready
+
+    def finish(self, wait_for_pending=True):
+        """Return every remaining complete page in order and stop the workers.
+
+        With wait_for_pending=False (e.g. when the crawl is aborting), only
+        pages that are already complete are returned and the rest are
+        dropped. Their links stay queued in the frontier for --resume.
+        """
+        if wait_for_pending:
+            for _, _, futures in self._pages:
+                wait(futures)
+        ready = self._take_ready(skip_failed=not wait_for_pending)
+        if self._pages:
+            dropped = sum(len(records) for _, records, _ in self._pages)
+            self._pages.clear()
+            self.pending = 0
+            logger.warning(f"Dropped {dropped} records whose detail pages were still being fetched")
+        with self._lock:
+            self._waiting.clear()
+        self._stop.set()
+        self._wakeup.set()
+        if wait_for_pending:
+            # Workers still fetching are left to finish on their own when aborting
+            for thread in self._threads:
+                thread.join()
+            self.frontier.close()
+        logger.info(f"Fetched {self.fetched} detail pages, skipped {self.reused} repeated links")
+        return ready
@@ -0,0 +1,324 @@
+import logging
+import threading
+from collections import Counter
+from functools import partial
+from urllib.parse import urljoin
+
+import soupsieve
+from bs4 import Tag
+
+from parser_backend import parse_simple_selector
+from checkpoint import Checkpoint
+
+logger = logging.getLogger(__name__)
+
+# Items a union is evaluated in full before its winning alternative is tried first
+LEARN_ITEMS = 20
+# Give up learning a union after this many items without a clear winner
+LEARN_LIMIT = 500
+# While trying the winner first, still check one item in this many against the full union
+VERIFY_EVERY = 50
+
+def _get_text(element):
+    return element.get_text(strip=True)
+
+def _get_href(resolve, element):
+    href = element.get("href")
+    if href:
+        return resolve(href)
+    return "N/A"
+
+def _get_attribute(attribute, element):
+    return element.get(attribute, "N/A")
+
+class SimpleMatcher:
+    """Match a union of simple tag/class/id selectors with one walk of the subtree"""
+
+    def __init__(self, alternatives):
+        self.alternatives = alternatives
+
+    @classmethod
+    def compile(cls, selector):
+        """Return a matcher for the selector, or None if soupsieve is needed"""
+        alternatives = []
+        for part in selector.split(','):
+            parsed = parse_simple_selector(part)
+            if parsed is None:
+                return None
+            alternatives.append(parsed)
+        return cls(alternatives)
+
+    def match(self, node):
+        """True if the node itself matches one of the alternatives"""
+        attrs = node.attrs
+        for tag, classes, element_id in self.alternatives:
+            if tag and tag != node.name:
+                continue
+            if element_id and element_id != attrs.get('id'):
+                continue
+            if classes and not classes.issubset(attrs.get('class') or ()):
+                continue
+            return True
+        return False
+
+    def select_one(self, element):
+        alternatives = self.alternatives
+        for node in element.descendants:
+            if not isinstance(node, Tag):
+                continue
+            for tag, classes, element_id in alternatives:
+                if tag and tag != node.name:
+                    continue
+                attrs = node.attrs
+                if element_id and element_id != attrs.get('id'):
+                    continue
+                if classes and not classes.issubset(attrs.get('class') or ()):
+                    continue
+                return node
+        return None
+
+def compile_selector(selector):
+    """Compile a selector to the fast SimpleMatcher when possible, else to soupsieve"""
+    return SimpleMatcher.compile(selector) or soupsieve.compile(selector)
+
+def split_selector_list(selector):
+    """Split a selector list on its top-level commas"""
+    parts = []
+    depth = 0
+    quote = None
+    start = 0
+    for i, char in enumerate(selector):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(selector[start:i].strip())
+            start = i + 1
+    parts.append(selector[start:].strip())
+    return [part for part in parts if part]
+
+class AdaptiveSelector:
+    """A selector union that learns which alternative wins and tries it first.
+
+    For the first items the whole union is evaluated and each result is
+    credited to the alternatives that match it. Once one alternative has
+    matched every result for LEARN_ITEMS items, it is tried on its own first.
+    Only when it finds nothing are the other alternatives searched. Every
+    VERIFY_EVERY-th item still runs the full union, and if the winner did not
+    produce that result the selector goes back to learning.
+
+    This is not always the union's result: the union returns the first
+    element in document order matching any alternative, while the winner
+    returns its own first match even when another alternative matched an
+    earlier element. It suits unions whose alternatives are fallbacks for
+    different page layouts, so it is only used when a config opts in.
+    One selector is shared by threads, so its learning state is locked.
+    """
+
+    def __init__(self, selector, alternatives):
+        self.selector = selector
+        self.alternatives = alternatives
+        self.matchers = [compile_selector(alternative) for alternative in alternatives]
+        self.union = compile_selector(selector)
+        self.hits = Counter()
+        self.winner = None
+        self.rest = None
+        self.calls = 0
+        self.settled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget the winner and start learning again"""
+        self.winner = None
+        self.rest = None
+        self.window = Counter()
+        self.window_items = 0
+        self.window_found = 0
+
+    def promote(self, index):
+        """Try alternative `index` first, then the others in order of past hits"""
+        others = sorted(
+            (alternative for i, alternative in enumerate(self.alternatives) if i != index),
+            key=lambda alternative: -self.hits[alternative],
+        )
+        self.rest = compile_selector(', '.join(others)) if others else None
+        self.winner = index
+        logger.debug(f"Trying '{self.alternatives[index]}' first for '{self.selector}'")
+
+    def select_one(self, element):
+        # Match outside the lock; only the bookkeeping is serialised
+        with self._lock:
+            self.calls += 1
+            winner, rest = self.winner, self.rest
+            shortcut = winner is not None and self.calls % VERIFY_EVERY
+        if shortcut:
+            found = self.matchers[winner].select_one(element)
+            if found is None and rest is not None:
+                found = rest.select_one(element)
+                if found is not None:
+                    with self._lock:
+                        self.credit(found)
+            elif found is not None:
+                with self._lock:
+                    self.hits[self.alternatives[winner]] += 1
+            return found
+
+        found = self.union.select_one(element)
+        if not self.settled:
+            with self._lock:
+                self.learn(found)
+        return found
+
+    def credit(self, found):
+        """Count a hit for every alternative matching the found element, returning their indexes"""
+        matching = [i for i, matcher in enumerate(self.matchers) if matcher.match(found)]
+        for i in matching:
+            self.hits[self.alternatives[i]] += 1
+        return matching
+
+    def learn(self, found):
+        self.window_items += 1
+        if found is not None:
+            matching = self.credit(found)
+            if self.winner is not None:
+                if self.winner not in matching:
+                    logger.debug(f"'{self.alternatives[self.winner]}' no longer wins for '{self.selector}'")
+                    self.reset()
+                return
+            self.window_found += 1
+            self.window.update(matching)
+
+        if self.winner is not None:
+            return
+        # Only switch when the field is usually present, since a miss searches twice
+        if self.window_found >= LEARN_ITEMS and self.window_found * 10 >= self.window_items * 9:
+            index, count = self.window.most_common(1)[0]
+            if count == self.window_found:
+                self.promote(index)
+                return
+        if self.window_items >= LEARN_LIMIT:
+            self.settled = True
+
+    def state(self):
+        """Learned hit counts and winner, as plain JSON"""
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        return {
+            "selector": self.selector,
+            "order": sorted(self.alternatives, key=lambda alternative: -self.hits[alternative]),
+            "hits": dict(self.hits),
+            "winner": self.alternatives[self.winner] if self.winner is not None else None,
+        }
+
+    def load_state(self, state):
+        """Restore state saved by a previous run, ignoring it if the selector has changed"""
+        if state.get("selector") != self.selector:
+            return
+        with self._lock:
+            self.hits.update({alternative: count for alternative, count in state.get("hits", {}).items()
+                              if alternative in self.alternatives})
+            if state.get("winner") in self.alternatives:
+                self.promote(self.alternatives.index(state["winner"]))
+
+class FieldPlan:
+    """A single field with its selector compiled and its value getter bound"""
+
+    def __init__(self, name, selector, attribute, base_url, learn=False):
+        self.name = name
+        self.selector = selector
+        self.attribute = attribute
+        self.matcher = None
+        if selector:
+            try:
+                self.matcher = self.compile(selector, learn)
+            except Exception as e:
+                logger.error(f"Invalid selector for field '{name}': {e}")
+
+        if attribute == "text":
+            self.getter = _get_text
+        elif attribute == "href":
+            self.getter = partial(_get_href, partial(urljoin, base_url))
+        else:
+            self.getter = partial(_get_attribute, attribute)
+
+    @staticmethod
+    def compile(selector, learn):
+        alternatives = split_selector_list(selector) if learn else []
+        if len(alternatives) > 1:
+            try:
+                return AdaptiveSelector(selector, alternatives)
+            except Exception:
+                # The split went wrong somewhere; compile the union as written
+                pass
+        return compile_selector(selector)
+
+    def extract(self, element):
+        """Extract this field's value from an item element"""
+        if self.matcher is None:
+            return "N/A"
+        try:
+            found_element = self.matcher.select_one(element)
+            if found_element is None:
+                return "N/A"
+            return self.getter(found_element)
+        except Exception as e:
+            logger.error(f"Error extracting field: {e}")
+            return "N/A"
+
+class ExtractionPlan:
+    """Field extraction compiled once from a scraper config.
+
+    Selectors are parsed and attribute getters bound at load time, so
+    extracting an item is a plain loop over prepared callables. With
+    `learn_selectors`, comma unions learn which alternative wins on the site
+    (see AdaptiveSelector). The learned order can be saved per config and
+    picked up by later runs.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    @classmethod
+    def from_config(cls, config):
+        base_url = config.get("base_url", "")
+        learn = config.get("learn_selectors", False)
+        fields = [
+            FieldPlan(name, field_config.get("selector", ""), field_config.get("attribute", "text"), base_url, learn)
+            for name, field_config in config["fields"].items()
+        ]
+        return cls(fields)
+
+    def selector_state(self):
+        """What each field's union has learned so far, keyed by field name"""
+        return {field.name: field.matcher.state() for field in self.fields
+                if isinstance(field.matcher, AdaptiveSelector)}
+
+    def load_selector_state(self, state):
+        for field in self.fields:
+            if isinstance(field.matcher, AdaptiveSelector) and field.name in state:
+                field.matcher.load_state(state[field.name])
+
+    def load_selector_stats(self, path):
+        """Start from the order learned by earlier runs, if one was saved at `path`"""
+        saved = Checkpoint.load(path)
+        if saved:
+            self.load_selector_state(saved.state)
+
+    def save_selector_stats(self, path):
+        """Save the learned order atomically for the next run"""
+        state = self.selector_state()
+        if state:
+            Checkpoint(path, state).save()
+
+    def extract(self, element):
+        """Extract every configured field from an item element"""
+        return {field.name: field.extract(element) for field in self.fields}
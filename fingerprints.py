@@ -0,0 +1,154 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+
+from dedup import default_key_fields, has_key
+
+logger = logging.getLogger(__name__)
+
+# Record change types written to the `change` column of an incremental run
+NEW = 'new'
+CHANGED = 'changed'
+REMOVED = 'removed'
+
+# Parts of a page that change on every load without the listing changing
+VOLATILE_MARKUP = re.compile(
+    r'<script\b.*?</script\s*>|<style\b.*?</style\s*>|<!--.*?-->|<meta\b[^>]*>'
+    r'|<input\b[^>]*\btype\s*=\s*["\']?hidden[^>]*>',
+    re.IGNORECASE | re.DOTALL,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    raw_digest TEXT,
+    region_digest TEXT,
+    items INTEGER NOT NULL,
+    run INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    data TEXT NOT NULL,
+    run INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_url ON records (url);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+def digest(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+def page_digest(html_content):
+    """Fingerprint of a page's markup without scripts, styles, comments, meta tags or hidden inputs"""
+    return digest(VOLATILE_MARKUP.sub('', html_content))
+
+def region_digest(elements):
+    """Fingerprint of the item elements of a parsed page"""
+    return digest(''.join(str(element) for element in elements))
+
+class FingerprintStore:
+    """Fingerprints of the pages and records seen by the previous runs of a crawl.
+
+    Each run gets a number. A page whose fingerprint matches the stored one
+    is skipped, and its stored records are marked as seen in this run. A
+    record is identified by its `key_fields` and compared by all its fields,
+    so `diff()` returns only new and changed records. A record whose key
+    fields are all missing is identified by its whole content instead. When a crawl completes,
+    `removed()` returns the records no page produced this time.
+    """
+
+    def __init__(self, path, key_fields):
+        self.path = path
+        self.key_fields = key_fields
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        with self._db:
+            row = self._db.execute("SELECT value FROM meta WHERE name = 'run'").fetchone()
+            self.run = (row[0] if row else 0) + 1
+            self._db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('run', ?)", (self.run,))
+
+    @classmethod
+    def from_config(cls, config, path):
+        """Open the store for a config's `incremental` block; records are keyed by link when there is one"""
+        key_fields = config.get("incremental", {}).get("key_fields") or default_key_fields(config["fields"])
+        return cls(path, key_fields)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def unchanged_page(self, url, raw=None, region=None):
+        """Return the stored item count if the page matches its last fingerprint, else None.
+
+        A matching page's records count as seen in this run. A page matched by
+        its item region gets its new raw fingerprint stored, so the next run
+        can skip it before parsing.
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT raw_digest, region_digest, items FROM pages WHERE url = ?', (url,)
+            ).fetchone()
+            if row is None or not ((raw and raw == row[0]) or (region and region == row[1])):
+                return None
+            with self._db:
+                self._db.execute(
+                    'UPDATE pages SET run = ?, raw_digest = COALESCE(?, raw_digest) WHERE url = ?', (self.run, raw, url)
+                )
+                self._db.execute('UPDATE records SET run = ? WHERE url = ?', (self.run, url))
+            return row[2]
+
+    def diff(self, url, records, raw=None, region=None):
+        """Store a page's records and fingerprint, returning the new and changed records.
+
+        Each returned record gets a `change` field of "new" or "changed".
+        """
+        changes = []
+        rows = []
+        with self._lock:
+            for record in records:
+                content = digest(json.dumps(record, sort_keys=True))
+                if has_key(record, self.key_fields):
+                    key = digest(json.dumps([record.get(field) for field in self.key_fields]))
+                else:
+                    # Keyed by "N/A", every such record would overwrite the same row
+                    key = content
+                row = self._db.execute('SELECT digest FROM records WHERE key = ?', (key,)).fetchone()
+                if row is None or row[0] != content:
+                    changes.append(dict(record, change=NEW if row is None else CHANGED))
+                rows.append((key, url, content, json.dumps(record), self.run))
+            with self._db:
+                self._db.executemany('INSERT OR REPLACE INTO records (key, url, digest, data, run) VALUES (?, ?, ?, ?, ?)', rows)
+                self._db.execute(
+                    'INSERT OR REPLACE INTO pages (url, raw_digest, region_digest, items, run) VALUES (?, ?, ?, ?, ?)',
+                    (url, raw, region, len(records), self.run),
+                )
+        return changes
+
+    def removed(self):
+        """Forget and return the records not seen in this run, each with change "removed".
+
+        Only call this after a complete crawl, or everything it skipped is reported.
+        """
+        with self._lock:
+            rows = self._db.execute('SELECT data FROM records WHERE run < ?', (self.run,)).fetchall()
+            with self._db:
+                self._db.execute('DELETE FROM records WHERE run < ?', (self.run,))
+                self._db.execute('DELETE FROM pages WHERE run < ?', (self.run,))
+        return [dict(json.loads(data), change=REMOVED) for data, in rows]
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# URL states in the frontier
+QUEUED = 'queued'
+IN_PROGRESS = 'in_progress'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    key INTEGER NOT NULL UNIQUE,
+    url TEXT,
+    host TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS urls_queue ON urls (state, host, priority DESC);
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    next_time REAL NOT NULL
+);
+"""
+
+def normalize_url(url):
+    """Canonical form of a URL: lowercase scheme and host, no default port or fragment, sorted query"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+def url_key(url):
+    """64-bit key of a normalized URL, which is what the visited set stores"""
+    digest = hashlib.blake2b(normalize_url(url).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+def discard(path):
+    """Delete a frontier database and its WAL files, so the next open starts empty"""
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+class FrontierEntry:
+    """A URL handed out by the frontier, with the data it was queued with"""
+
+    def __init__(self, url, priority, attempts, data):
+        self.url = url
+        self.priority = priority
+        self.attempts = attempts
+        self.data = data
+
+class Frontier:
+    """SQLite-backed crawl frontier with priorities, host politeness and a visited set.
+
+    Every URL ever added is keyed by a hash of its normalized form, so it is
+    only queued once. Once fetched, only the key and the result passed to
+    `done()` are kept, and `status()` answers whether a URL was already
+    fetched without fetching it again. `next()` hands
+    out the highest-priority queued URL whose host is free; a host is busy
+    for `politeness` seconds after each URL from it is handed out. Failed
+    URLs are queued again with a growing delay until `max_attempts`.
+    URLs that were in progress when a run stopped are queued again on open.
+    """
+
+    def __init__(self, path=':memory:', politeness=1.0, max_attempts=3, retry_delay=30.0):
+        self.path = path
+        self.politeness = politeness
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        with self._db:
+            requeued = self._db.execute('UPDATE urls SET state = ? WHERE state = ?', (QUEUED, IN_PROGRESS)).rowcount
+        if requeued:
+            logger.info(f"Re-queued {requeued} URLs left in progress in {path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def add(self, url, priority=0, data=None):
+        """Queue a URL unless it was ever added before; returns True if it is new"""
+        return self.add_many([url], priority, [data]) == 1
+
+    def add_many(self, urls, priority=0, data=None):
+        """Queue several URLs in one transaction and return how many were new"""
+        data = data or [None] * len(urls)
+        rows = [
+            (url_key(url), url, urlsplit(url).netloc.lower(), priority, QUEUED,
+             json.dumps(item) if item is not None else None)
+            for url, item in zip(urls, data)
+        ]
+        with self._lock:
+            before = self._db.total_changes
+            with self._db:
+                self._db.executemany(
+                    'INSERT OR IGNORE INTO urls (key, url, host, priority, state, data) VALUES (?, ?, ?, ?, ?, ?)',
+                    rows,
+                )
+                added = self._db.total_changes - before
+                self._db.executemany(
+                    'INSERT OR IGNORE INTO hosts (host, next_time) VALUES (?, 0)', {(row[2],) for row in rows}
+                )
+            return added
+
+    def status(self, url):
+        """Return (state, data) for a URL that was ever added, or None; data is the result of a done URL"""
+        with self._lock:
+            row = self._db.execute('SELECT state, data FROM urls WHERE key = ?', (url_key(url),)).fetchone()
+        if row is None:
+            return None
+        state, data = row
+        return state, json.loads(data) if data else None
+
+    def next(self):
+        """Claim the best URL that can be fetched now, or None if none is ready"""
+        now = time.time()
+        with self._lock, self._db:
+            # Best ready URL of each free host via the index, then the best of those
+            row = self._db.execute(
+                """SELECT u.key, u.url, u.host, u.priority, u.attempts, u.data FROM hosts h
+                   JOIN urls u ON u.rowid = (
+                       SELECT rowid FROM urls WHERE state = ? AND host = h.host AND not_before <= ?
+                       ORDER BY priority DESC, rowid LIMIT 1)
+                   WHERE h.next_time <= ?
+                   ORDER BY u.priority DESC, u.rowid LIMIT 1""",
+                (QUEUED, now, now),
+            ).fetchone()
+            if row is None:
+                return None
+            key, url, host, priority, attempts, data = row
+            self._db.execute('UPDATE urls SET state = ? WHERE key = ?', (IN_PROGRESS, key))
+            self._db.execute('UPDATE hosts SET next_time = ? WHERE host = ?', (now + self.politeness, host))
+        return FrontierEntry(url, priority, attempts, json.loads(data) if data else None)
+
+    def wait_time(self):
+        """Seconds until a queued URL becomes ready: 0 if one is ready, None if the queue is empty"""
+        with self._lock:
+            row = self._db.execute(
+                """SELECT MIN(MAX(h.next_time, (SELECT MIN(not_before) FROM urls WHERE state = ? AND host = h.host)))
+                   FROM hosts h""",
+                (QUEUED,),
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def done(self, url, result=None):
+        """Mark a URL fetched, keeping only its key and result in the visited set"""
+        result = json.dumps(result) if result is not None else None
+        with self._lock, self._db:
+            self._db.execute('UPDATE urls SET state = ?, url = NULL, data = ? WHERE key = ?', (DONE, result, url_key(url)))
+
+    def failed(self, url):
+        """Queue a URL again after a growing delay, or give up on it after max_attempts"""
+        key = url_key(url)
+        with self._lock, self._db:
+            row = self._db.execute('SELECT attempts FROM urls WHERE key = ?', (key,)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            if attempts >= self.max_attempts:
+                self._db.execute('UPDATE urls SET state = ?, attempts = ? WHERE key = ?', (FAILED, attempts, key))
+                logger.warning(f"Giving up on {url} after {attempts} attempts")
+                return False
+            self._db.execute(
+                'UPDATE urls SET state = ?, attempts = ?, not_before = ? WHERE key = ?',
+                (QUEUED, attempts, time.time() + self.retry_delay * 2 ** (attempts - 1), key),
+            )
+            return True
+
+    def stats(self):
+        with self._lock:
+            return dict(self._db.execute('SELECT state, COUNT(*) FROM urls GROUP BY state').fetchall())
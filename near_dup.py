@@ -0,0 +1,179 @@
+import hashlib
+import logging
+import re
+import zlib
+from array import array
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ('drop', 'cluster')
+
+WORD = re.compile(r'\w+')
+
+# Sketch values are kept to 32 bits; bins left empty by short texts borrow from a neighbour
+VALUE_MASK = (1 << 32) - 1
+EMPTY = VALUE_MASK + 1
+BORROW_STEP = 0x9E3779B1
+# crc32 is fast and stable across runs; multiplying spreads its bits over 64
+MIX = 0x9E3779B97F4A7C15
+
+def shingles(words):
+    """The distinct words and word pairs of a text"""
+    return set(words).union(f"{first} {second}" for first, second in zip(words, words[1:]))
+
+def minhash(features, bins):
+    """One-permutation MinHash sketch: each feature is hashed once, into one of `bins` bins.
+
+    The share of equal bins in two sketches estimates the Jaccard
+    similarity of their feature sets. Returns the sketch and how many of
+    its bins had to be filled from a neighbour.
+    """
+    sketch = [EMPTY] * bins
+    for feature in features:
+        value = (zlib.crc32(feature.encode('utf-8')) * MIX) & 0xFFFFFFFFFFFFFFFF
+        index = value % bins
+        value = (value // bins) & VALUE_MASK
+        if value < sketch[index]:
+            sketch[index] = value
+    empty = sketch.count(EMPTY)
+    if empty:
+        # An empty bin takes the value of the next filled one, shifted by the distance
+        original = list(sketch)
+        for index in range(bins):
+            if original[index] != EMPTY:
+                continue
+            distance = 1
+            while original[(index + distance) % bins] == EMPTY:
+                distance += 1
+            sketch[index] = (original[(index + distance) % bins] + distance * BORROW_STEP) & VALUE_MASK
+    return sketch, empty
+
+class MinHashIndex:
+    """Find earlier sketches similar to a query without comparing against all of them.
+
+    Sketches are cut into `bands` bands of `rows` bins. Sketches sharing any
+    whole band are candidates, and a candidate matches when at least
+    `threshold` of all bins are equal. Pairs with similarity s become
+    candidates with probability 1 - (1 - s**rows)**bands.
+    """
+
+    def __init__(self, bands=8, rows=4, threshold=0.8):
+        self.bands = bands
+        self.rows = rows
+        self.bins = bands * rows
+        self.needed = threshold * self.bins
+        self.tables = [{} for _ in range(bands)]
+        self.sketches = {}
+
+    def band_keys(self, sketch):
+        rows = self.rows
+        return [hash(tuple(sketch[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+    def find(self, sketch, keys):
+        """The id of the first stored sketch similar enough to this one, or None"""
+        checked = set()
+        for key, table in zip(keys, self.tables):
+            candidates = table.get(key)
+            if candidates is None:
+                continue
+            for item_id in (candidates if isinstance(candidates, list) else (candidates,)):
+                if item_id in checked:
+                    continue
+                checked.add(item_id)
+                if sum(a == b for a, b in zip(sketch, self.sketches[item_id])) >= self.needed:
+                    return item_id
+        return None
+
+    def add(self, sketch, keys, item_id):
+        self.sketches[item_id] = array('I', sketch)
+        for key, table in zip(keys, self.tables):
+            # Most bands are unique, so store a bare id until a second one arrives
+            existing = table.get(key)
+            if existing is None:
+                table[key] = item_id
+            elif isinstance(existing, list):
+                existing.append(item_id)
+            else:
+                table[key] = [existing, item_id]
+
+class NearDuplicateFilter:
+    """Drop or cluster records whose text is nearly the same as an earlier record's.
+
+    The configured fields are joined, split into words and word pairs, and
+    MinHashed. A record whose estimated similarity to an earlier record is at
+    least `threshold` is a near duplicate. With action "drop" it is left
+    out. With "cluster" every record gets a `cluster` field holding the
+    number of the first record of its group. Texts that leave more than a
+    quarter of the sketch's bins empty (under about 20 words with the
+    default 32 bins) give unreliable estimates, so they only match an
+    earlier short text with exactly the same words in the same order.
+    """
+
+    def __init__(self, fields=('title', 'description'), threshold=0.8, action='drop', bands=8, rows=4):
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown near-duplicate action '{action}', expected one of {', '.join(ACTIONS)}")
+        self.fields = fields
+        self.action = action
+        self.index = MinHashIndex(bands, rows, threshold)
+        # digest of a short text's words -> its cluster
+        self.short = {}
+        self.seen = 0
+        self.matched = 0
+
+    @classmethod
+    def from_config(cls, config, action=None):
+        """Build a filter from a config's `near_duplicates` block, or None if it is disabled"""
+        near = config.get("near_duplicates", {})
+        if not (action or near.get("enabled")):
+            return None
+        fields = near.get("fields") or [field for field in ("title", "description") if field in config["fields"]]
+        return cls(
+            fields,
+            threshold=near.get("threshold", 0.8),
+            action=action or near.get("action", "drop"),
+            bands=near.get("bands", 8),
+            rows=near.get("rows", 4),
+        )
+
+    def text(self, record):
+        return ' '.join(
+            str(record[field]) for field in self.fields
+            if record.get(field) not in (None, '', 'N/A')
+        )
+
+    def cluster_of(self, record):
+        """The cluster number of an earlier near duplicate, or None after indexing the record as new"""
+        self.seen += 1
+        words = WORD.findall(self.text(record).lower())
+        if not words:
+            return None
+        sketch, empty = minhash(shingles(words), self.index.bins)
+        if empty * 4 > self.index.bins:
+            digest = hashlib.blake2b(' '.join(words).encode('utf-8'), digest_size=8).digest()
+            cluster = self.short.setdefault(digest, self.seen)
+            if cluster == self.seen:
+                return None
+            self.matched += 1
+            return cluster
+        keys = self.index.band_keys(sketch)
+        cluster = self.index.find(sketch, keys)
+        if cluster is None:
+            self.index.add(sketch, keys, self.seen)
+        else:
+            self.matched += 1
+        return cluster
+
+    def filter(self, records):
+        """Drop near duplicates, or label every record with its cluster"""
+        if self.action == 'drop':
+            return [record for record in records if self.cluster_of(record) is None]
+        labelled = []
+        for record in records:
+            cluster = self.cluster_of(record)
+            labelled.append(dict(record, cluster=self.seen if cluster is None else cluster))
+        return labelled
+
+    def log_stats(self):
+        if self.matched:
+            verb = "Dropped" if self.action == 'drop' else "Clustered"
+            logger.info(f"{verb} {self.matched} near-duplicate records")
@@ -0,0 +1,69 @@
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from parser_backend import make_soup, strainer_for_selector
+from extraction_plan import ExtractionPlan
+from structured_data import StructuredExtractor
+
+logger = logging.getLogger(__name__)
+
+class PageParser:
+    """Turn the raw HTML of a listing page into plain record dicts for one config"""
+
+    def __init__(self, config, parser=None):
+        self.item_selector = config["item_selector"]
+        self.parser = parser or config.get("parser", "auto")
+        self.strainer = strainer_for_selector(self.item_selector) if config.get("partial_parse", True) else None
+        self.plan = ExtractionPlan.from_config(config)
+        self.structured = StructuredExtractor.from_config(config)
+        # Workers start from the saved order but only the main process saves it
+        if config.get("selector_stats"):
+            self.plan.load_selector_stats(config["selector_stats"])
+
+    def parse(self, html_content):
+        records = self.structured.extract(html_content) if self.structured else None
+        if records is not None:
+            return records
+        soup = make_soup(html_content, self.parser, parse_only=self.strainer)
+        extract = self.plan.extract
+        return [extract(element) for element in soup.select(self.item_selector)]
+
+# Each worker process builds its own parser once, from the pool initializer
+_worker_parser = None
+
+def _init_worker(config, parser):
+    global _worker_parser
+    _worker_parser = PageParser(config, parser)
+
+def _parse_in_worker(html_content):
+    return _worker_parser.parse(html_content)
+
+class ParsePool:
+    """A pool of worker processes that parse pages into records.
+
+    Only the HTML string goes to a worker and only plain dicts come back,
+    so parsing runs on other cores while the main process keeps fetching.
+    """
+
+    def __init__(self, config, parser=None, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(config, parser),
+        )
+        logger.info(f"Started {self.workers} parse workers")
+
+    def submit(self, html_content):
+        """Queue a page for parsing, returning a concurrent.futures.Future of its records"""
+        return self._executor.submit(_parse_in_worker, html_content)
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
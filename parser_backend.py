@@ -0,0 +1,103 @@
+from bs4 import BeautifulSoup, SoupStrainer
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# BeautifulSoup tree builder name for each supported backend
+BACKENDS = {
+    'lxml': 'lxml',
+    'html.parser': 'html.parser',
+}
+
+FALLBACK_BACKEND = 'html.parser'
+
+# A compound selector made only of an optional tag name, classes and one id,
+# e.g. "div.job-item", ".listing", "li#main.card"
+SIMPLE_SELECTOR = re.compile(r'^(?P<tag>[a-zA-Z][\w-]*|\*)?(?P<rest>(?:[.#][\w-]+)*)$')
+
+def backend_available(name):
+    """Check whether the given parser backend can be used in this environment"""
+    if name == 'lxml':
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            return False
+        return True
+    return name in BACKENDS
+
+def resolve_backend(name=None):
+    """Return a usable backend name, falling back to the stdlib parser"""
+    if not name or name == 'auto':
+        return 'lxml' if backend_available('lxml') else FALLBACK_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown parser backend '{name}' (choose from {', '.join(BACKENDS)})")
+    if not backend_available(name):
+        logger.warning(f"Parser backend '{name}' is not installed, using {FALLBACK_BACKEND}")
+        return FALLBACK_BACKEND
+    return name
+
+_default_backend = None
+
+def get_default_backend():
+    """Return the backend make_soup uses when none is passed, resolving it on first use"""
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = resolve_backend()
+    return _default_backend
+
+def make_soup(html, backend=None, **kwargs):
+    """Build a BeautifulSoup tree with the configured parser backend"""
+    name = resolve_backend(backend) if backend else get_default_backend()
+    return BeautifulSoup(html, BACKENDS[name], **kwargs)
+
+def parse_simple_selector(selector):
+    """Split a simple compound selector into (tag, classes, id), or None if it is not simple"""
+    selector = selector.strip()
+    match = SIMPLE_SELECTOR.match(selector)
+    if not selector or not match:
+        return None
+    rest = match.group('rest')
+    ids = re.findall(r'#([\w-]+)', rest)
+    if len(ids) > 1:
+        return None
+    tag = match.group('tag')
+    return (
+        None if tag in (None, '*') else tag.lower(),
+        frozenset(re.findall(r'\.([\w-]+)', rest)),
+        ids[0] if ids else None,
+    )
+
+def strainer_for_selector(selector):
+    """Build a SoupStrainer that keeps only subtrees matched by a CSS selector.
+
+    Only comma-separated unions of simple compound selectors (tag, classes, id)
+    can be checked while the document is being parsed. Anything with
+    combinators, pseudo-classes or attribute tests returns None, meaning the
+    caller should parse the full document.
+    """
+    alternatives = []
+    for part in selector.split(','):
+        parsed = parse_simple_selector(part)
+        if parsed is None:
+            return None
+        alternatives.append(parsed)
+    if not alternatives:
+        return None
+
+    def matches(name, attrs):
+        classes = attrs.get('class') or ()
+        if isinstance(classes, str):
+            classes = classes.split()
+        element_id = attrs.get('id')
+        for tag, wanted_classes, wanted_id in alternatives:
+            if tag and tag != name:
+                continue
+            if wanted_id and wanted_id != element_id:
+                continue
+            if wanted_classes and not wanted_classes.issubset(classes):
+                continue
+            return True
+        return False
+
+    return SoupStrainer(matches)
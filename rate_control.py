@@ -0,0 +1,128 @@
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Status codes that mean the server wants us to slow down
+THROTTLE_STATUSES = (429, 503)
+
+def parse_retry_after(value):
+    """Turn a Retry-After header (seconds or HTTP date) into seconds to wait"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class _HostBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+class AdaptiveRateController:
+    """Per-host token bucket whose rate adapts to how the server responds.
+
+    The rate stays between 1/max_delay and 1/min_delay requests per second
+    and starts at the middle of that window. Fast successful responses raise
+    it a little at a time. 429/503 responses, slow responses and failed
+    requests cut it in half. A Retry-After header pauses the host for as
+    long as the server asks.
+    """
+
+    def __init__(self, min_delay=0.5, max_delay=1.0, burst=1, slow_response=5.0,
+                 increase=0.05, decrease=0.5, jitter=0.1):
+        self.min_delay = min_delay
+        self.min_rate = 1.0 / max(max_delay, 1e-6)
+        self.max_rate = 1.0 / max(min_delay, 1e-6)
+        self.start_rate = 2.0 / (min_delay + max_delay) if min_delay + max_delay > 0 else self.max_rate
+        self.burst = burst
+        self.slow_response = slow_response
+        self.increase = increase
+        self.decrease = decrease
+        self.jitter = jitter
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a controller from a config's rate_limiting block, or None unless it sets adaptive"""
+        rate_limiting = config.get("rate_limiting", {})
+        if not rate_limiting.get("adaptive", False):
+            return None
+        return cls(
+            min_delay=rate_limiting.get("delay_min", 0.5),
+            max_delay=rate_limiting.get("delay_max", 1.0),
+            burst=rate_limiting.get("burst", 1),
+            slow_response=rate_limiting.get("slow_response", 5.0),
+        )
+
+    def _bucket(self, host):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = _HostBucket(self.start_rate, self.burst)
+        return bucket
+
+    def reserve(self, url):
+        """Take a token for the URL's host and return how long to wait before sending"""
+        host = urlparse(url).netloc
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            bucket.tokens = min(bucket.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+            bucket.updated = now
+            bucket.tokens -= 1
+            blocked = bucket.blocked_until - now
+            wait = max(0.0, -bucket.tokens / bucket.rate, blocked)
+        if wait and self.jitter:
+            # Jitter never shortens a wait below min_delay or a Retry-After pause
+            floor = min(wait, max(self.min_delay, blocked))
+            wait = max(floor, wait * random.uniform(1 - self.jitter, 1 + self.jitter))
+        return wait
+
+    def wait(self, url):
+        """Block until a request to the URL's host is allowed"""
+        delay = self.reserve(url)
+        if delay:
+            time.sleep(delay)
+
+    def feedback(self, url, status=None, elapsed=None, retry_after=None):
+        """Adjust the host's rate after a response (status None means the request failed)"""
+        host = urlparse(url).netloc
+        with self._lock:
+            bucket = self._bucket(host)
+            throttled = status is None or status in THROTTLE_STATUSES
+            if throttled or (elapsed is not None and elapsed > self.slow_response):
+                bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+                logger.info(f"Slowing down {host} to {bucket.rate:.2f} req/s")
+            elif status < 400:
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase * self.max_rate)
+            if retry_after:
+                bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + retry_after)
+                logger.info(f"{host} asked us to wait {retry_after:.0f}s")
+
+    def on_response(self, response, *args, **kwargs):
+        """requests response hook feeding every response back into the controller"""
+        self.feedback(
+            response.url,
+            response.status_code,
+            response.elapsed.total_seconds(),
+            parse_retry_after(response.headers.get('Retry-After')),
+        )
+        return response
+
+    def install(self, session):
+        """Feed a session's responses into this controller"""
+        session.hooks['response'].append(self.on_response)
+        return session
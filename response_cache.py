@@ -0,0 +1,182 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Request headers that change what a server sends back, so they are part of the key
+VARY_HEADERS = ('Accept', 'Accept-Language', 'User-Agent')
+
+class ResponseCache:
+    """Content-addressed on-disk cache of page bodies.
+
+    Entries are keyed by a hash of the URL and the request headers in
+    VARY_HEADERS. Each entry is a body file plus a small JSON metadata file.
+    Fresh entries (younger than `ttl` seconds) are served without touching
+    the network. Stale ones are revalidated with If-None-Match /
+    If-Modified-Since, and a 304 reuses the stored body. When the cache
+    grows past `max_bytes`, the least recently used entries are evicted.
+    """
+
+    def __init__(self, directory='.scraper_cache', ttl=3600, max_bytes=500 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._entries())
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a cache from a config's `cache` block, or return None if it is disabled"""
+        cache_config = config.get("cache", {})
+        if not cache_config.get("enabled"):
+            return None
+        return cls(
+            directory=cache_config.get("directory", '.scraper_cache'),
+            ttl=cache_config.get("ttl", 3600),
+            max_bytes=int(cache_config.get("max_size_mb", 500) * 1024 * 1024),
+        )
+
+    def key(self, url, headers):
+        parts = [url] + [f"{name}:{headers.get(name, '')}" for name in VARY_HEADERS]
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        directory = os.path.join(self.directory, key[:2])
+        return os.path.join(directory, key + '.body'), os.path.join(directory, key + '.json')
+
+    def _load(self, key):
+        body_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        return meta, body
+
+    def _write_atomic(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _store(self, key, meta, body):
+        body_path, meta_path = self._paths(key)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        old_size = os.path.getsize(body_path) if os.path.exists(body_path) else 0
+        self._write_atomic(body_path, body)
+        self._write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+        with self._lock:
+            self._total_bytes += len(body) - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _touch(self, key):
+        """Mark an entry as recently used for LRU eviction"""
+        _, meta_path = self._paths(key)
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        """Yield (key, body size, last use time) for every entry on disk"""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                key = name[:-5]
+                body_path, meta_path = self._paths(key)
+                try:
+                    yield key, os.path.getsize(body_path), os.path.getmtime(meta_path)
+                except OSError:
+                    continue
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        target = self.max_bytes * 0.9
+        for key, size, _ in entries:
+            if self._total_bytes <= target:
+                break
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._total_bytes -= size
+        logger.debug(f"Cache evicted down to {self._total_bytes} bytes")
+
+    def _decode(self, meta, body):
+        return body.decode(meta.get("encoding") or 'utf-8', errors='replace')
+
+    def lookup(self, url, headers):
+        """Return the cached text if a fresh entry exists, else None (no network)"""
+        key = self.key(url, headers)
+        meta, body = self._load(key)
+        if meta is None or time.time() - meta["stored_at"] >= self.ttl:
+            return None
+        with self._lock:
+            self.hits += 1
+        self._touch(key)
+        return self._decode(meta, body)
+
+    def get(self, session, url, timeout=30):
+        """Fetch a URL through the cache and return its text.
+
+        Raises requests.RequestException like a plain session.get followed by
+        raise_for_status.
+        """
+        key = self.key(url, session.headers)
+        meta, body = self._load(key)
+
+        if meta is not None and time.time() - meta["stored_at"] < self.ttl:
+            with self._lock:
+                self.hits += 1
+            self._touch(key)
+            return self._decode(meta, body)
+
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers['If-None-Match'] = meta["etag"]
+            if meta.get("last_modified"):
+                headers['If-Modified-Since'] = meta["last_modified"]
+
+        response = session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and meta is not None:
+            with self._lock:
+                self.revalidated += 1
+            meta["stored_at"] = time.time()
+            self._write_atomic(self._paths(key)[1], json.dumps(meta).encode('utf-8'))
+            return self._decode(meta, body)
+
+        response.raise_for_status()
+        with self._lock:
+            self.misses += 1
+        meta = {
+            "url": url,
+            "stored_at": time.time(),
+            "etag": response.headers.get('ETag'),
+            "last_modified": response.headers.get('Last-Modified'),
+            "encoding": response.encoding or response.apparent_encoding,
+        }
+        self._store(key, meta, response.content)
+        return response.text
+
+    def log_stats(self):
+        logger.info(f"Cache: {self.hits} hits, {self.revalidated} revalidated, {self.misses} misses")
@@ -0,0 +1,137 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+
+from rate_control import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Error classes returned by classify_error
+TRANSIENT = 'transient'
+PERMANENT = 'permanent'
+NOT_FOUND = 'not_found'
+
+TRANSIENT_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+NOT_FOUND_STATUSES = (404, 410)
+
+class FetchError(Exception):
+    """A URL could not be fetched, even after any retries"""
+
+    def __init__(self, url, kind, cause):
+        super().__init__(f"{cause} ({kind})")
+        self.url = url
+        self.kind = kind
+        self.cause = cause
+
+class ErrorBudgetExceeded(Exception):
+    """Too many fetches failed in this run, so the crawl should stop"""
+
+def classify_error(error):
+    """Sort a requests exception into transient, permanent or not_found"""
+    response = getattr(error, 'response', None)
+    if response is not None:
+        if response.status_code in NOT_FOUND_STATUSES:
+            return NOT_FOUND
+        if response.status_code in TRANSIENT_STATUSES:
+            return TRANSIENT
+        return PERMANENT
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)):
+        return TRANSIENT
+    return PERMANENT
+
+class ErrorBudget:
+    """Run-wide failure limits shared by every fetch.
+
+    A long run of consecutive failed attempts means the host is down, and
+    too many URLs failing for good means the crawl is not worth finishing.
+    Either one raises ErrorBudgetExceeded.
+    """
+
+    def __init__(self, max_failed_urls=25, max_consecutive_errors=8):
+        self.max_failed_urls = max_failed_urls
+        self.max_consecutive_errors = max_consecutive_errors
+        self.failed_urls = 0
+        self.consecutive_errors = 0
+        self._lock = threading.Lock()
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_errors = 0
+
+    def record_error(self):
+        with self._lock:
+            self.consecutive_errors += 1
+            if self.max_consecutive_errors and self.consecutive_errors >= self.max_consecutive_errors:
+                raise ErrorBudgetExceeded(f"{self.consecutive_errors} consecutive request errors, host looks down")
+
+    def record_failed_url(self):
+        with self._lock:
+            self.failed_urls += 1
+            if self.max_failed_urls and self.failed_urls >= self.max_failed_urls:
+                raise ErrorBudgetExceeded(f"{self.failed_urls} URLs failed in this run")
+
+class RetryPolicy:
+    """Retry transient fetch errors with exponential backoff and full jitter.
+
+    Each URL gets at most `max_attempts` tries. Waits grow from `base_delay`
+    up to `max_delay`, and a Retry-After header is honoured when it asks for
+    longer. Permanent errors and 404/410 are not retried. Every failure is
+    counted against the shared ErrorBudget.
+    """
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=30.0, budget=None):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or ErrorBudget()
+
+    @classmethod
+    def from_config(cls, config):
+        retry_config = config.get("retry", {})
+        return cls(
+            max_attempts=retry_config.get("max_attempts", 4),
+            base_delay=retry_config.get("base_delay", 1.0),
+            max_delay=retry_config.get("max_delay", 30.0),
+            budget=ErrorBudget(
+                max_failed_urls=retry_config.get("max_failed_urls", 25),
+                max_consecutive_errors=retry_config.get("max_consecutive_errors", 8),
+            ),
+        )
+
+    def backoff(self, attempt, error=None):
+        """Seconds to wait before the given retry attempt (1 = first retry)"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        response = getattr(error, 'response', None)
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after:
+                delay = max(delay, min(retry_after, self.max_delay * 4))
+        return delay
+
+    def call(self, func, url):
+        """Call func(url), retrying transient requests errors.
+
+        Raises FetchError when the URL fails for good and ErrorBudgetExceeded
+        when the run has failed too often to continue.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                result = func(url)
+            except requests.RequestException as e:
+                kind = classify_error(e)
+                if kind == NOT_FOUND:
+                    self.budget.record_success()
+                    raise FetchError(url, kind, e)
+                self.budget.record_error()
+                if kind == PERMANENT or attempt == self.max_attempts:
+                    self.budget.record_failed_url()
+                    raise FetchError(url, kind, e)
+                delay = self.backoff(attempt, e)
+                logger.warning(f"Attempt {attempt} for {url} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+            else:
+                self.budget.record_success()
+                return result
@@ -13,9 +13,10 @@ echo 2. BuiltWith Websites
 echo 3. Job Sites (Indeed, LinkedIn)
 echo 4. App Stores (Google Play, Apple App Store)
 echo 5. Custom Website
+echo 6. All Configs (batch)
 echo ========================================
 echo.
-set /p choice="Enter your choice (1-5): "
+set /p choice="Enter your choice (1-6): "
 
 if "%choice%"=="1" (
     echo Running BuiltWith Technology Scraper...
@@ -35,6 +36,9 @@ if "%choice%"=="1" (
     echo.
     echo Edit scraper_config.json with your website details
     echo Then run: python3 universal_scraper.py --config scraper_config.json
+) else if "%choice%"=="6" (
+    echo Running every config in configs/...
+    python3 universal_scraper.py --batch configs --output-dir output
 ) else (
     echo Invalid choice!
 )
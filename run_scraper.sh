@@ -14,9 +14,10 @@ echo "2. BuiltWith Websites"
 echo "3. Job Sites (Indeed, LinkedIn)"
 echo "4. App Stores (Google Play, Apple App Store)"
 echo "5. Custom Website"
+echo "6. All Configs (batch)"
 echo "========================================"
 echo ""
-read -p "Enter your choice (1-5): " choice
+read -p "Enter your choice (1-6): " choice
 
 case $choice in
     1)
@@ -42,6 +43,10 @@ case $choice in
         echo "Edit scraper_config.json with your website details"
         echo "Then run: python3 universal_scraper.py --config scraper_config.json"
         ;;
+    6)
+        echo "Running every config in configs/..."
+        python3 universal_scraper.py --batch configs --output-dir output
+        ;;
     *)
         echo "Invalid choice!"
         ;;
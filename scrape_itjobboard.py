@@ -1,35 +1,48 @@
-import requests
-from bs4 import BeautifulSoup
 import csv
-import time
-import random
 from urllib.parse import urljoin, urlparse, parse_qs
 import logging
+import argparse
+
+from response_cache import ResponseCache
+from archive import open_archive
+from rate_control import AdaptiveRateController
+from retry import FetchError, NOT_FOUND
+from transport import Transport
+from parser_backend import make_soup, BACKENDS
+from sinks import CsvSink
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+FIELDNAMES = ['title', 'company', 'location', 'job_type', 'date_posted', 'description', 'link']
+
 class ITJobBoardScraper:
-    def __init__(self):
+    def __init__(self, parser=None, sink=None, cache=None, archive=None):
         self.base_url = "https://www.itjobboard.co.uk/jobs/"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.parser = parser
+        self.cache = cache
+        self.archive = archive
+        self.sink = sink
+        self.transport = Transport(
+            cache=cache,
+            archive=archive,
+            # Adaptive delay between 500ms and 1000ms per host
+            rate_controller=AdaptiveRateController(min_delay=0.5, max_delay=1.0),
+        )
+        self.session = self.transport.session
         self.jobs = []
+        self.job_count = 0
         self.max_jobs = 5000
         
     def get_page(self, url):
         """Get a page with error handling and rate limiting"""
         try:
-            # Random delay between 500ms and 1000ms
-            time.sleep(random.uniform(0.5, 1.0))
-            
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
+            return self.transport.get(url)
+        except FetchError as e:
+            if e.kind == NOT_FOUND:
+                # Past the last page of results
+                return ''
             logger.error(f"Error fetching {url}: {e}")
             return None
     
@@ -75,15 +88,18 @@ class ITJobBoardScraper:
             return None
     
     def scrape_page(self, page_num):
-        """Scrape a single page of job listings"""
+        """Scrape a single page of job listings, returning None if it could not be fetched"""
         url = f"{self.base_url}?page={page_num}" if page_num > 1 else self.base_url
         logger.info(f"Scraping page {page_num}: {url}")
         
         html_content = self.get_page(url)
+        if html_content is None:
+            logger.warning(f"Skipping page {page_num}, it could not be fetched")
+            return None
         if not html_content:
             return 0
         
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = make_soup(html_content, self.parser)
         
         # Find job listings
         job_elements = soup.find_all('div', class_='listing-item')
@@ -92,33 +108,41 @@ class ITJobBoardScraper:
             logger.warning(f"No job listings found on page {page_num}")
             return 0
         
-        page_jobs = 0
+        page_jobs = []
         for job_element in job_elements:
-            if len(self.jobs) >= self.max_jobs:
+            if self.job_count + len(page_jobs) >= self.max_jobs:
                 logger.info(f"Reached maximum jobs limit ({self.max_jobs})")
-                return page_jobs
+                break
             
             job_data = self.parse_job_listing(job_element)
             if job_data:
-                self.jobs.append(job_data)
-                page_jobs += 1
+                page_jobs.append(job_data)
         
-        logger.info(f"Found {page_jobs} jobs on page {page_num}")
-        return page_jobs
+        self.emit(page_jobs)
+        logger.info(f"Found {len(page_jobs)} jobs on page {page_num}")
+        return len(page_jobs)
+    
+    def emit(self, jobs):
+        """Stream a page of jobs to the sink, or keep them in memory without one"""
+        self.job_count += len(jobs)
+        if self.sink:
+            self.sink.write_many(jobs)
+        else:
+            self.jobs.extend(jobs)
     
     def scrape_all(self):
         """Scrape all available job listings"""
         page_num = 1
         total_jobs = 0
         
-        while len(self.jobs) < self.max_jobs:
+        while self.job_count < self.max_jobs:
             jobs_on_page = self.scrape_page(page_num)
             
             if jobs_on_page == 0:
                 logger.info("No more jobs found, stopping pagination")
                 break
             
-            total_jobs += jobs_on_page
+            total_jobs += jobs_on_page or 0
             page_num += 1
             
             # Safety check to prevent infinite loops
@@ -126,7 +150,7 @@ class ITJobBoardScraper:
                 logger.warning("Reached page limit, stopping")
                 break
         
-        logger.info(f"Total jobs scraped: {len(self.jobs)}")
+        logger.info(f"Total jobs scraped: {self.job_count}")
         return self.jobs
     
     def save_to_csv(self, filename='itjobboard_5k.csv'):
@@ -135,22 +159,34 @@ class ITJobBoardScraper:
             logger.warning("No jobs to save")
             return
         
-        fieldnames = ['title', 'company', 'location', 'job_type', 'date_posted', 'description', 'link']
-        
         with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
             writer.writeheader()
             writer.writerows(self.jobs)
         
         logger.info(f"Saved {len(self.jobs)} jobs to {filename}")
 
 def main():
-    scraper = ITJobBoardScraper()
+    parser = argparse.ArgumentParser(description='IT Job Board Scraper')
+    parser.add_argument('--parser', choices=['auto'] + list(BACKENDS), default='auto', help='HTML parser backend')
+    parser.add_argument('--cache', action='store_true', help='Cache responses on disk between runs')
+    parser.add_argument('--record', metavar='ARCHIVE', help='Record every response to an archive')
+    parser.add_argument('--replay', metavar='ARCHIVE', help='Serve responses from an archive instead of the network')
+    parser.add_argument('--output', '-o', default='itjobboard_5k.csv', help='Output CSV file')
+    args = parser.parse_args()
+    
+    scraper = ITJobBoardScraper(
+        parser=args.parser,
+        cache=ResponseCache() if args.cache else None,
+        archive=open_archive(args.record, args.replay),
+    )
     logger.info("Starting IT Job Board scraper...")
     
     try:
-        jobs = scraper.scrape_all()
-        scraper.save_to_csv()
+        # Jobs are written and flushed page by page as they are scraped
+        with CsvSink(args.output, fieldnames=FIELDNAMES) as sink:
+            scraper.sink = sink
+            scraper.scrape_all()
         logger.info("Scraping completed successfully!")
     except Exception as e:
         logger.error(f"Scraping failed: {e}")
@@ -0,0 +1,128 @@
+import csv
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+class RecordSink:
+    """Write records to a file as they are produced instead of at the end of a run.
+
+    Call write_many once per parsed page: it writes the records and flushes
+    them, so everything scraped so far is on disk if the process dies.
+
+    Passing `offset` resumes an earlier run: the file is truncated to that
+    byte offset (dropping anything written after the last checkpoint) and
+    new records are appended, with `count` records assumed already present.
+    """
+
+    def __init__(self, filename, offset=None, count=0):
+        self.filename = filename
+        self.resumed = offset is not None and count > 0 and os.path.exists(filename)
+        self.count = count if self.resumed else 0
+        if self.resumed:
+            with open(filename, 'r+b') as f:
+                f.truncate(offset)
+        self.file = open(filename, 'a' if self.resumed else 'w', newline='', encoding='utf-8')
+
+    def write(self, record):
+        self._write(record)
+        self.count += 1
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+        self.flush()
+
+    def flush(self):
+        self.file.flush()
+
+    def tell(self):
+        """Byte offset just past the last record written"""
+        self.file.flush()
+        return os.fstat(self.file.fileno()).st_size
+
+    def close(self):
+        if self.file.closed:
+            return
+        self._finish()
+        self.file.close()
+        logger.info(f"Saved {self.count} items to {self.filename}")
+
+    def _write(self, record):
+        raise NotImplementedError
+
+    def _finish(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class CsvSink(RecordSink):
+    """CSV output; the header comes from fieldnames or the first record's keys"""
+
+    def __init__(self, filename, fieldnames=None, offset=None, count=0):
+        super().__init__(filename, offset, count)
+        self.fieldnames = list(fieldnames) if fieldnames else None
+        self.writer = None
+        if self.resumed and not self.fieldnames:
+            with open(filename, newline='', encoding='utf-8') as f:
+                self.fieldnames = next(csv.reader(f), None)
+
+    def _write(self, record):
+        if self.writer is None:
+            self.writer = csv.DictWriter(
+                self.file, fieldnames=self.fieldnames or list(record.keys()), extrasaction='ignore'
+            )
+            if not self.resumed:
+                self.writer.writeheader()
+        self.writer.writerow(record)
+
+class JsonLinesSink(RecordSink):
+    """One JSON object per line; every flushed line is a complete record"""
+
+    def _write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False))
+        self.file.write('\n')
+
+class JsonArraySink(RecordSink):
+    """A single JSON array written incrementally.
+
+    The file is a valid JSON document once the sink is closed; use
+    JsonLinesSink when output must stay readable after a crash.
+    """
+
+    def __init__(self, filename, offset=None, count=0):
+        super().__init__(filename, offset, count)
+        if not self.resumed:
+            self.file.write('[')
+
+    def _write(self, record):
+        body = json.dumps(record, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+        self.file.write(('\n  ' if self.count == 0 else ',\n  ') + body)
+
+    def _finish(self):
+        self.file.write('\n]\n' if self.count else ']\n')
+
+SINKS = {
+    'csv': CsvSink,
+    'jsonl': JsonLinesSink,
+    'json': JsonArraySink,
+}
+
+def open_sink(filename, fmt=None, fieldnames=None, **kwargs):
+    """Open a sink for the given format, inferring it from the file extension if omitted.
+
+    `fieldnames` fixes the CSV columns up front, for outputs whose records do
+    not all have the same keys; the JSON formats keep every record's own keys.
+    """
+    if fmt is None:
+        fmt = os.path.splitext(filename)[1].lstrip('.').lower() or 'csv'
+    if fmt not in SINKS:
+        raise ValueError(f"Unknown output format '{fmt}' (choose from {', '.join(SINKS)})")
+    if fieldnames and fmt == 'csv':
+        kwargs['fieldnames'] = fieldnames
+    return SINKS[fmt](filename, **kwargs)
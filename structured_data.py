@@ -0,0 +1,194 @@
+import json
+import logging
+import re
+from urllib.parse import urljoin
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCRIPT_TYPES = ("application/ld+json",)
+
+SCRIPT_PATTERN = re.compile(r'<script\b([^>]*)>(.*?)</script\s*>', re.IGNORECASE | re.DOTALL)
+TYPE_PATTERN = re.compile(r'\btype\s*=\s*["\']?([^"\'\s>]+)', re.IGNORECASE)
+PATH_STEP = re.compile(r'([^.\[\]]+)|\[(\*|-?\d+)\]')
+
+_decoder = json.JSONDecoder()
+
+def compile_path(path):
+    """Split a path like "offers[0].price" or "itemListElement[*].item" into steps"""
+    steps = []
+    for key, index in PATH_STEP.findall(path):
+        if key:
+            steps.append(key)
+        elif index == '*':
+            steps.append(None)
+        else:
+            steps.append(int(index))
+    return steps
+
+def resolve(data, steps):
+    """Every value a compiled path reaches in data; [*] fans out over a list"""
+    values = [data]
+    for step in steps:
+        found = []
+        for value in values:
+            if step is None:
+                if isinstance(value, list):
+                    found.extend(value)
+            elif isinstance(step, int):
+                if isinstance(value, list) and -len(value) <= step < len(value):
+                    found.append(value[step])
+            elif isinstance(value, dict) and step in value:
+                found.append(value[step])
+        values = found
+    return values
+
+def find_typed(data, type_name):
+    """Every object in data whose @type is type_name, without looking inside matches"""
+    if isinstance(data, list):
+        for value in data:
+            yield from find_typed(value, type_name)
+    elif isinstance(data, dict):
+        declared = data.get("@type")
+        if declared == type_name or (isinstance(declared, list) and type_name in declared):
+            yield data
+            return
+        for value in data.values():
+            if isinstance(value, (dict, list)):
+                yield from find_typed(value, type_name)
+
+def to_text(value):
+    """Flatten a JSON value into the string a record field holds, or None if empty"""
+    if isinstance(value, dict):
+        value = value.get("name", value.get("@id"))
+    if isinstance(value, list):
+        parts = [to_text(item) for item in value]
+        value = ', '.join(part for part in parts if part)
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    if isinstance(value, bool):
+        value = str(value).lower()
+    text = str(value).strip()
+    return text or None
+
+def iter_payloads(html, script_types=DEFAULT_SCRIPT_TYPES, variables=()):
+    """Decode the JSON embedded in a page without parsing its HTML.
+
+    Yields the body of every <script> whose type is in script_types, and the
+    object assigned to each named variable (e.g. window.__INITIAL_STATE__ = {...}).
+    Payloads that are not valid JSON are skipped.
+    """
+    script_types = {script_type.lower() for script_type in script_types}
+    for match in SCRIPT_PATTERN.finditer(html):
+        declared = TYPE_PATTERN.search(match.group(1))
+        if not declared or declared.group(1).lower() not in script_types:
+            continue
+        body = match.group(2).strip()
+        if body.startswith('<!--'):
+            body = body[4:].rsplit('-->', 1)[0]
+        try:
+            yield json.loads(body)
+        except ValueError as e:
+            logger.debug(f"Skipping invalid embedded JSON: {e}")
+
+    for variable in variables:
+        for match in re.finditer(rf'\b{re.escape(variable)}\s*=\s*', html):
+            try:
+                yield _decoder.raw_decode(html, match.end())[0]
+            except ValueError as e:
+                logger.debug(f"Skipping invalid JSON assigned to {variable}: {e}")
+
+class StructuredField:
+    """One record field read from a path into an embedded JSON item"""
+
+    def __init__(self, name, path, default="N/A", base_url=None):
+        self.name = name
+        self.steps = compile_path(path)
+        self.default = default
+        self.base_url = base_url
+
+    def extract(self, item):
+        if not self.steps:
+            return self.default
+        for value in resolve(item, self.steps):
+            text = to_text(value)
+            if text is not None:
+                return urljoin(self.base_url, text) if self.base_url is not None else text
+        return self.default
+
+class StructuredExtractor:
+    """Build records from the JSON-LD or inline JSON a page embeds.
+
+    Items are every object of `item_type` (a schema.org @type such as
+    "JobPosting"), or the values `items` reaches in each payload, or the
+    payloads themselves. An item none of whose fields resolve is not a
+    record, so a payload of some other kind (breadcrumbs, site search) is
+    skipped. `extract()` returns None when a page has no such items, so the
+    caller can fall back to its CSS selectors.
+    """
+
+    def __init__(self, fields, items=None, item_type=None, script_types=DEFAULT_SCRIPT_TYPES, variables=()):
+        self.fields = fields
+        self.item_steps = compile_path(items) if items else None
+        self.item_type = item_type
+        self.script_types = script_types
+        self.variables = variables
+
+    @classmethod
+    def from_config(cls, config):
+        """Build an extractor from a config's `structured_data` block, or None if it has none.
+
+        Records get the same keys, in the same order, as the CSS `fields`, so
+        pages read either way line up. A field without a path is "N/A", and
+        an href field is resolved against base_url.
+        """
+        structured = config.get("structured_data")
+        if not structured or not structured.get("fields"):
+            return None
+        paths = structured["fields"]
+        unknown = [name for name in paths if name not in config["fields"]]
+        if unknown:
+            logger.warning(f"Ignoring structured_data fields missing from fields: {', '.join(unknown)}")
+        fields = []
+        for name, field_config in config["fields"].items():
+            spec = paths.get(name) or {}
+            if isinstance(spec, str):
+                spec = {"path": spec}
+            href = field_config.get("attribute") == "href"
+            fields.append(StructuredField(
+                name, spec.get("path", ""),
+                default=spec.get("default", "N/A"),
+                base_url=config.get("base_url", "") if href else None,
+            ))
+        return cls(
+            fields,
+            items=structured.get("items"),
+            item_type=structured.get("type"),
+            script_types=structured.get("script_types", DEFAULT_SCRIPT_TYPES),
+            variables=structured.get("variables", ()),
+        )
+
+    def iter_items(self, html):
+        for payload in iter_payloads(html, self.script_types, self.variables):
+            candidates = resolve(payload, self.item_steps) if self.item_steps else [payload]
+            for candidate in candidates:
+                if self.item_type:
+                    yield from find_typed(candidate, self.item_type)
+                elif isinstance(candidate, list):
+                    yield from (item for item in candidate if isinstance(item, dict))
+                elif isinstance(candidate, dict):
+                    yield candidate
+
+    def iter_records(self, html):
+        """Records for the embedded items, skipping items where every field is its default"""
+        for item in self.iter_items(html):
+            values = [field.extract(item) for field in self.fields]
+            if any(value != field.default for field, value in zip(self.fields, values)):
+                yield {field.name: value for field, value in zip(self.fields, values)}
+
+    def extract(self, html):
+        """Records for every embedded item on the page, or None if there are none"""
+        return list(self.iter_records(html)) or None
+
+    def extract_one(self, html):
+        """The record for the first embedded item, or None"""
+        return next(self.iter_records(html), None)
@@ -0,0 +1,236 @@
+import logging
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+from urllib3.util.request import ACCEPT_ENCODING
+
+from retry import RetryPolicy
+from coalesce import RequestCoalescer
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts in seconds: fail fast on dead hosts, wait on slow pages
+DEFAULT_TIMEOUT = (5, 30)
+
+# Host pools kept alive, and connections kept per host (above any per-host concurrency)
+POOL_CONNECTIONS = 32
+POOL_MAXSIZE = 16
+
+# Seconds a resolved host is reused, and hosts remembered per adapter
+DNS_TTL = 300
+DNS_MAX_HOSTS = 1024
+
+# urllib3 advertises br (and zstd) only when it can decode them, i.e. when brotli is installed
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'Connection': 'keep-alive',
+}
+
+_adapter = None
+_adapter_lock = threading.Lock()
+
+class DNSCache:
+    """Resolved addresses of the hosts one adapter connects to, reused for `ttl` seconds.
+
+    At most `max_hosts` lookups are kept, dropping the least recently used.
+    When none of a host's cached addresses accept a connection the host is
+    forgotten, so the next attempt resolves it again and follows failover.
+    """
+
+    def __init__(self, ttl=DNS_TTL, max_hosts=DNS_MAX_HOSTS):
+        self.ttl = ttl
+        self.max_hosts = max_hosts
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, host, port):
+        key = (host, port)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                return entry[1]
+        addresses = socket.getaddrinfo(host, port, allowed_gai_family(), socket.SOCK_STREAM)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, addresses)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_hosts:
+                self._entries.popitem(last=False)
+        return addresses
+
+    def forget(self, host, port):
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+    def create_connection(self, address, timeout=None, source_address=None, socket_options=None):
+        """Connect to the first reachable address of (host, port), like urllib3's create_connection"""
+        host, port = address
+        host = host.strip('[]')
+        error = None
+        for family, socktype, proto, _, sockaddr in self.resolve(host, port):
+            sock = None
+            try:
+                sock = socket.socket(family, socktype, proto)
+                for option in socket_options or ():
+                    sock.setsockopt(*option)
+                if isinstance(timeout, (int, float)):
+                    sock.settimeout(timeout)
+                if source_address:
+                    sock.bind(source_address)
+                sock.connect(sockaddr)
+                return sock
+            except OSError as e:
+                error = e
+                if sock is not None:
+                    sock.close()
+        self.forget(host, port)
+        raise error or OSError(f"No addresses found for {host}")
+
+class _CachedDNSConnection:
+    """Connection mixin that resolves its host through the class's dns_cache"""
+
+    dns_cache = None
+
+    def _new_conn(self):
+        try:
+            return self.dns_cache.create_connection(
+                (self._dns_host, self.port), self.timeout,
+                source_address=self.source_address, socket_options=self.socket_options,
+            )
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        except socket.timeout as e:
+            raise ConnectTimeoutError(self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})") from e
+        except OSError as e:
+            raise NewConnectionError(self, f"Failed to establish a new connection: {e}") from e
+
+class CachingDNSAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections share one DNSCache, leaving socket.getaddrinfo alone"""
+
+    def __init__(self, dns_ttl=DNS_TTL, **kwargs):
+        self.dns_cache = DNSCache(dns_ttl)
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        pools = {}
+        for scheme, pool_cls, connection_cls in (
+            ('http', HTTPConnectionPool, HTTPConnection),
+            ('https', HTTPSConnectionPool, HTTPSConnection),
+        ):
+            connection = type(f"CachedDNS{connection_cls.__name__}", (_CachedDNSConnection, connection_cls),
+                              {'dns_cache': self.dns_cache})
+            pools[scheme] = type(f"CachedDNS{pool_cls.__name__}", (pool_cls,), {'ConnectionCls': connection})
+        self.poolmanager.pool_classes_by_scheme = pools
+
+def shared_adapter():
+    """The process-wide adapter, so every scraper reuses the same warm connections and DNS lookups"""
+    global _adapter
+    with _adapter_lock:
+        if _adapter is None:
+            _adapter = CachingDNSAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            # TCP keep-alive stops idle pooled connections from being dropped silently
+            _adapter.init_poolmanager(
+                POOL_CONNECTIONS, POOL_MAXSIZE,
+                socket_options=HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)],
+            )
+        return _adapter
+
+def create_session(headers=None):
+    """Session on the shared connection pool with the default browser headers"""
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    if headers:
+        session.headers.update(headers)
+    adapter = shared_adapter()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+class Transport:
+    """Fetches pages for a scraper: session, cache, archive, pacing and retries.
+
+    Sessions share one connection pool, so scrapers in the same process reuse
+    each other's connections. Cookies and headers stay per session. `get()`
+    coalesces repeated URLs: concurrent requests for a page share one fetch,
+    and a page fetched in the last 60 seconds is reused while the kept pages
+    stay under 8 MB. Older or evicted pages are fetched again.
+    """
+
+    def __init__(self, headers=None, timeout=DEFAULT_TIMEOUT, cache=None, archive=None,
+                 rate_controller=None, retry=None):
+        self.session = create_session(headers)
+        self.timeout = timeout
+        self.cache = cache
+        self.archive = archive
+        if archive:
+            archive.install(self.session)
+        self.rate_controller = rate_controller
+        if rate_controller:
+            rate_controller.install(self.session)
+        self.retry = retry or RetryPolicy()
+        self.coalescer = RequestCoalescer()
+
+    @property
+    def replaying(self):
+        """True when responses come from a replay archive, so no delays are needed"""
+        return bool(self.archive and self.archive.replaying)
+
+    @property
+    def caching(self):
+        """True when pages go through the cache.
+
+        Recording bypasses it, so the archive holds every page's full
+        response rather than empty 304 revalidations or nothing for fresh hits.
+        """
+        return bool(self.cache) and not (self.archive and not self.archive.replaying)
+
+    def lookup(self, url):
+        """Return a fresh cached copy of a page without any network access, or None"""
+        if not self.caching:
+            return None
+        return self.cache.lookup(url, self.session.headers)
+
+    def request(self, url, pace=True):
+        """Make a single request for a URL, raising requests exceptions"""
+        if pace and self.rate_controller and not self.replaying:
+            self.rate_controller.wait(url)
+        try:
+            if self.caching:
+                return self.cache.get(self.session, url, timeout=self.timeout)
+
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            return response.text
+        except requests.RequestException as e:
+            if self.rate_controller and e.response is None:
+                self.rate_controller.feedback(url)
+            raise
+
+    def fetch(self, url, pace=True):
+        """Fetch a URL with retries, raising FetchError if it fails for good.
+
+        With pace=False the caller has already waited for the rate controller.
+        """
+        return self.retry.call(lambda target: self.request(target, pace), url)
+
+    def get(self, url):
+        """Return a page from the cache or the network, raising FetchError on failure"""
+        return self.coalescer.call(url, self._get)
+
+    def _get(self, url):
+        cached = self.lookup(url)
+        if cached is not None:
+            return cached
+        return self.fetch(url)
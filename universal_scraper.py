@@ -1,5 +1,3 @@
-import requests
-from bs4 import BeautifulSoup
 import csv
 import time
 import random
@@ -7,20 +5,76 @@ import json
 import logging
 from urllib.parse import urljoin, urlparse
 import argparse
+import asyncio
 import sys
+import os
+import glob
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+
+from async_engine import AsyncFetchEngine
+from response_cache import ResponseCache
+from parser_backend import make_soup, strainer_for_selector, BACKENDS
+from extraction_plan import ExtractionPlan
+from structured_data import StructuredExtractor
+from parse_pool import ParsePool
+from detail_enricher import DetailEnricher
+from frontier import discard as discard_frontier
+from sinks import open_sink, SINKS
+from checkpoint import Checkpoint
+from fingerprints import FingerprintStore, page_digest, region_digest
+from dedup import Deduplicator, MODES as DEDUP_MODES
+from near_dup import NearDuplicateFilter, ACTIONS as NEAR_DUP_ACTIONS
+from archive import open_archive
+from rate_control import AdaptiveRateController
+from retry import RetryPolicy, FetchError, ErrorBudgetExceeded, NOT_FOUND
+from transport import Transport, DEFAULT_TIMEOUT
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Mark the end of the fetched page stream, and an empty page, in the parse pipeline
+_END_OF_PAGES = object()
+_EMPTY_PAGE = object()
+
 class UniversalScraper:
-    def __init__(self, config_file=None):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+    def __init__(self, config_file=None, parser=None, cache=None, archive=None):
         self.data = []
+        self.item_count = 0
+        self.start_page = 1
+        self.failed_pages = []
+        self.retry_pages = []
+        self.details = None
+        self.frontier_path = None
+        self.sink = None
+        self.checkpoint = None
+        self.fingerprints = None
+        self.unchanged = 0
+        self._page_prints = {}
         self.config = self.load_config(config_file)
+        self.parser = parser or self.config.get("parser", "auto")
+        self.item_strainer = self.build_item_strainer()
+        self.plan = ExtractionPlan.from_config(self.config)
+        self.structured = StructuredExtractor.from_config(self.config)
+        self.dedup = Deduplicator.from_config(self.config)
+        self.near_dups = NearDuplicateFilter.from_config(self.config)
+        self.selector_stats = self.config.get("selector_stats")
+        if self.selector_stats:
+            self.plan.load_selector_stats(self.selector_stats)
+        self.cache = cache or ResponseCache.from_config(self.config)
+        self.archive = archive
+        self.rate_controller = AdaptiveRateController.from_config(self.config)
+        timeouts = self.config.get("timeouts", {})
+        self.transport = Transport(
+            timeout=(timeouts.get("connect", DEFAULT_TIMEOUT[0]), timeouts.get("read", DEFAULT_TIMEOUT[1])),
+            cache=self.cache,
+            archive=archive,
+            rate_controller=self.rate_controller,
+            retry=RetryPolicy.from_config(self.config),
+        )
+        self.session = self.transport.session
         
     def load_config(self, config_file):
         """Load scraping configuration from JSON file"""
@@ -38,6 +92,7 @@ class UniversalScraper:
         """Default configuration for common job sites"""
         return {
             "base_url": "",
+            "parser": "auto",
             "item_selector": "div.listing-item, .job-listing, .posting",
             "fields": {
                 "title": {
@@ -77,19 +132,60 @@ class UniversalScraper:
             "max_items": 5000
         }
     
+    def build_item_strainer(self):
+        """Derive a parse filter from item_selector, or None to parse whole pages"""
+        if not self.config.get("partial_parse", True):
+            return None
+        strainer = strainer_for_selector(self.config["item_selector"])
+        if strainer is None:
+            logger.info("item_selector is too complex for partial parsing, parsing full pages")
+        return strainer
+    
     def get_page(self, url):
-        """Get a page with error handling and rate limiting"""
+        """Get a page with error handling and rate limiting, reusing a fetch of the same URL in flight or from the last minute"""
+        return self.transport.coalescer.call(url, self._get_page)
+    
+    def _get_page(self, url):
+        cached = self.cached_page(url)
+        if cached is not None:
+            return cached
+        
+        if not self.replaying:
+            self.wait_before_request(url)
+        return self.fetch_url(url)
+    
+    def wait_before_request(self, url):
+        """Pace requests with the adaptive controller, or a fixed random delay without one"""
+        if self.rate_controller:
+            self.rate_controller.wait(url)
+            return
+        delay = random.uniform(
+            self.config["rate_limiting"]["delay_min"],
+            self.config["rate_limiting"]["delay_max"]
+        )
+        time.sleep(delay)
+    
+    @property
+    def replaying(self):
+        """True when responses come from a replay archive, so no delays are needed"""
+        return self.transport.replaying
+    
+    def cached_page(self, url):
+        """Return a fresh cached copy of a page without any network access, or None"""
+        return self.transport.lookup(url)
+    
+    def fetch_url(self, url):
+        """Fetch a URL with retries, without the initial delay.
+        
+        Returns the page text, an empty string for a page that does not
+        exist (404/410, the end of the listing), or None if the fetch failed.
+        """
         try:
-            delay = random.uniform(
-                self.config["rate_limiting"]["delay_min"],
-                self.config["rate_limiting"]["delay_max"]
-            )
-            time.sleep(delay)
-            
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
+            return self.transport.fetch(url, pace=False)
+        except FetchError as e:
+            if e.kind == NOT_FOUND:
+                logger.info(f"{url} not found")
+                return ''
             logger.error(f"Error fetching {url}: {e}")
             return None
     
@@ -122,69 +218,350 @@ class UniversalScraper:
             logger.error(f"Error extracting field: {e}")
             return "N/A"
     
-    def parse_items(self, soup):
+    def parse_items(self, soup, elements=None):
         """Parse items from the page using configured selectors"""
         items = []
-        item_selector = self.config["item_selector"]
-        
-        elements = soup.select(item_selector)
+        if elements is None:
+            elements = soup.select(self.config["item_selector"])
         logger.info(f"Found {len(elements)} items on page")
         
+        extract = self.plan.extract
+        room = self.room()
         for element in elements:
-            if len(self.data) >= self.config["max_items"]:
+            if len(items) >= room:
                 break
                 
-            item_data = {}
-            for field_name, field_config in self.config["fields"].items():
-                value = self.extract_field_value(element, field_config)
-                item_data[field_name] = value
+            item_data = extract(element)
             
             if item_data:
-                self.data.append(item_data)
                 items.append(item_data)
         
-        return len(items)
+        return items
     
-    def scrape_page(self, page_num=1):
-        """Scrape a single page"""
-        if page_num == 1:
-            url = self.config["base_url"]
+    def room(self):
+        """How many more items may be collected, counting those still waiting on detail pages"""
+        pending = self.details.pending if self.details else 0
+        return self.config["max_items"] - self.item_count - self.unchanged - pending
+    
+    def deliver(self, records, page_num):
+        """Pass a page of records on, through the detail stage when one is configured"""
+        if not self.details:
+            self.commit_page(records, page_num)
+            return
+        self.commit_pages(self.details.add_page(page_num, records))
+    
+    def commit_pages(self, pages):
+        for page_num, records in pages:
+            self.commit_page(records, page_num)
+    
+    def wait_for_details(self):
+        """Hold the crawl while the detail stage has too many records in flight"""
+        if self.details:
+            self.commit_pages(self.details.wait_for_room())
+    
+    async def wait_for_details_async(self):
+        """wait_for_details for the async crawl, without blocking its event loop"""
+        if self.details:
+            self.commit_pages(await self.details.wait_for_room_async())
+    
+    def commit_page(self, records, page_num):
+        """Emit a finished page of records (only the changes, in incremental mode) and checkpoint it"""
+        found = len(records)
+        if self.fingerprints:
+            prints = self._page_prints.pop(page_num, {})
+            records = self.fingerprints.diff(self.page_url(page_num), records, **prints)
+            self.unchanged += found - len(records)
+        self.emit(records)
+        if page_num in self.retry_pages:
+            self.retry_pages.remove(page_num)
+        if found:
+            self.save_checkpoint(page_num)
+    
+    def emit(self, records):
+        """Stream a page of records to the sink, or keep them in memory without one"""
+        if self.dedup:
+            records = self.dedup.filter(records)
+        if self.near_dups:
+            records = self.near_dups.filter(records)
+        self.item_count += len(records)
+        if self.sink:
+            self.sink.write_many(records)
         else:
-            pagination = self.config["pagination"]
-            if pagination["enabled"]:
-                pattern = pagination["pattern"]
-                url = self.config["base_url"] + pattern.format(page=page_num)
-            else:
-                return 0
+            self.data.extend(records)
+    
+    def page_url(self, page_num):
+        """Build the URL for a page number, or None if pagination is disabled"""
+        if page_num == 1:
+            return self.config["base_url"]
+        pagination = self.config["pagination"]
+        if not pagination["enabled"]:
+            return None
+        return self.config["base_url"] + pagination["pattern"].format(page=page_num)
+    
+    def scrape_page(self, page_num=1):
+        """Scrape a single page, returning its item count or None if it could not be fetched"""
+        url = self.page_url(page_num)
+        if not url:
+            return 0
         
         logger.info(f"Scraping page {page_num}: {url}")
         
         html_content = self.get_page(url)
+        return self.process_page(html_content, page_num)
+    
+    def process_page(self, html_content, page_num):
+        """Parse already-fetched page content and return the number of items found.
+        
+        Returns None when the page could not be fetched, so callers can skip it
+        instead of mistaking it for the end of the listing.
+        """
+        if html_content is None:
+            self.failed_pages.append(page_num)
+            logger.warning(f"Skipping page {page_num}, it could not be fetched")
+            return None
         if not html_content:
             return 0
         
-        soup = BeautifulSoup(html_content, 'html.parser')
-        items_found = self.parse_items(soup)
+        if self.fingerprints:
+            unchanged = self.fingerprint_page(page_num, html_content)
+            if unchanged is not None:
+                self.skip_unchanged(page_num, unchanged)
+                return unchanged
+            prints = self._page_prints[page_num]
         
-        logger.info(f"Found {items_found} items on page {page_num}")
-        return items_found
+        records = self.structured.extract(html_content) if self.structured else None
+        if records is not None:
+            records = records[:max(self.room(), 0)]
+        else:
+            soup = make_soup(html_content, self.parser, parse_only=self.item_strainer)
+            elements = soup.select(self.config["item_selector"])
+            if self.fingerprints:
+                # The markup around the items changed; check the items themselves
+                prints["region"] = region_digest(elements)
+                unchanged = self.unchanged_items(page_num)
+                if unchanged is not None:
+                    return unchanged
+            records = self.parse_items(soup, elements)
+        
+        logger.info(f"Found {len(records)} items on page {page_num}")
+        self.deliver(records, page_num)
+        return len(records)
+    
+    def fingerprint_page(self, page_num, html_content):
+        """Keep a fetched page's raw fingerprint, returning its stored item count if the last run saw the same page"""
+        self._page_prints[page_num] = {"raw": page_digest(html_content)}
+        return self.fingerprints.unchanged_page(self.page_url(page_num), **self._page_prints[page_num])
+    
+    def unchanged_items(self, page_num):
+        """Skip a page whose fingerprints match the last run, returning its item count, or None"""
+        items = self.fingerprints.unchanged_page(self.page_url(page_num), **self._page_prints[page_num])
+        if items is not None:
+            self.skip_unchanged(page_num, items)
+        return items
+    
+    def skip_unchanged(self, page_num, items):
+        del self._page_prints[page_num]
+        self.unchanged += items
+        logger.info(f"Page {page_num} is unchanged since the last run, skipping its {items} items")
+    
+    def save_checkpoint(self, page_num):
+        """Record a completed page, and the pages skipped so far, so an interrupted crawl can resume after it"""
+        if not self.checkpoint:
+            return
+        self.checkpoint.save(
+            base_url=self.config["base_url"],
+            # A retried page completes after later pages did
+            last_page=max(page_num, self.checkpoint.get("last_page", 0)),
+            failed_pages=sorted(set(self.failed_pages + self.retry_pages)),
+            items=self.item_count,
+            output=self.sink.filename if self.sink else None,
+            output_offset=self.sink.tell() if self.sink else None,
+        )
     
-    def scrape_all(self):
-        """Scrape all available pages"""
-        page_num = 1
+    def resume_from(self, checkpoint):
+        """Continue after the last page recorded in a checkpoint, retrying the pages it skipped first"""
+        self.start_page = checkpoint.get("last_page", 0) + 1
+        self.item_count = checkpoint.get("items", 0)
+        self.retry_pages = [page_num for page_num in checkpoint.get("failed_pages", []) if page_num < self.start_page]
+        logger.info(f"Resuming from page {self.start_page} with {self.item_count} items already saved")
+    
+    def retry_failed_pages(self):
+        """Fetch again the pages an earlier run skipped after repeated errors.
+        
+        A page leaves retry_pages once its records are committed, so until
+        then every checkpoint still lists it.
+        """
+        if not self.retry_pages:
+            return
+        logger.info(f"Retrying pages skipped by the previous run: {self.retry_pages}")
+        for page_num in list(self.retry_pages):
+            if self.room() <= 0:
+                break
+            if self.scrape_page(page_num) is None and page_num in self.retry_pages:
+                self.retry_pages.remove(page_num)
+            self.wait_for_details()
+    
+    def scrape_all(self, use_async=False, concurrency=None, prefetch=None, parse_workers=None):
+        """Scrape all available pages, then wait for any outstanding detail pages"""
+        self.details = DetailEnricher.from_config(self.config, self.get_page, self.parser, self.frontier_path)
+        finished = False
+        try:
+            self.retry_failed_pages()
+            if use_async:
+                self.scrape_all_async(concurrency, prefetch, parse_workers)
+            else:
+                self.scrape_pages()
+            finished = True
+        finally:
+            if self.details:
+                self.commit_pages(self.details.finish(wait_for_pending=finished))
+                self.details = None
+            if self.selector_stats:
+                self.plan.save_selector_stats(self.selector_stats)
+        
+        if self.fingerprints:
+            self.emit_removed()
+        
+        self.log_totals()
+        return self.data
+    
+    def scrape_pages(self):
+        """Scrape pages one after another until one comes back empty"""
+        page_num = self.start_page
         max_pages = self.config["pagination"]["max_pages"]
         
-        while len(self.data) < self.config["max_items"] and page_num <= max_pages:
+        while self.room() > 0 and page_num <= max_pages:
             items_on_page = self.scrape_page(page_num)
+            self.wait_for_details()
             
             if items_on_page == 0:
                 logger.info("No more items found, stopping pagination")
                 break
             
             page_num += 1
+    
+    def emit_removed(self):
+        """Emit the records the previous run had and this one did not find"""
+        if self.failed_pages:
+            logger.warning("Not reporting removed records, some pages could not be fetched")
+            return
+        removed = self.fingerprints.removed()
+        if removed:
+            logger.info(f"{len(removed)} records disappeared since the last run")
+            self.emit(removed)
+    
+    def log_totals(self):
+        logger.info(f"Total items scraped: {self.item_count}")
+        if self.fingerprints:
+            logger.info(f"Unchanged items skipped: {self.unchanged}")
+        if self.failed_pages:
+            logger.warning(f"Pages skipped after repeated errors: {self.failed_pages}")
+    
+    def scrape_all_async(self, concurrency=None, prefetch=None, parse_workers=None):
+        """Scrape pages with a sliding window of speculative prefetches"""
+        engine = AsyncFetchEngine.from_config(
+            self.fetch_url, self.config, per_host=concurrency, cached=self.cached_page,
+            rate=None if self.replaying else self.rate_controller
+        )
+        if self.replaying:
+            engine.delay_min = engine.delay_max = 0
+        window = prefetch or self.config["pagination"].get("prefetch") or engine.per_host
+        logger.info(f"Prefetching up to {window} pages ahead, {engine.per_host} requests per host")
         
-        logger.info(f"Total items scraped: {len(self.data)}")
-        return self.data
+        parse_workers = parse_workers if parse_workers is not None else self.config.get("parse_workers", 0)
+        if parse_workers:
+            with ParsePool(self.config, self.parser, parse_workers) as pool:
+                engine.run(self._crawl_pages_pooled(engine, window, pool))
+        else:
+            engine.run(self._crawl_pages(engine, window))
+    
+    def iter_page_urls(self):
+        """Yield every page URL up to max_pages, in page order"""
+        for page_num in range(self.start_page, self.config["pagination"]["max_pages"] + 1):
+            url = self.page_url(page_num)
+            if not url:
+                return
+            yield url
+    
+    async def _crawl_pages(self, engine, window):
+        """Consume prefetched pages in order, cancelling the rest on the first empty page"""
+        async with aclosing(engine.prefetch(self.iter_page_urls(), window)) as pages:
+            page_num = self.start_page
+            async for html_content in pages:
+                if self.room() <= 0:
+                    break
+                found = self.process_page(html_content, page_num)
+                await self.wait_for_details_async()
+                if found == 0:
+                    logger.info("No more items found, stopping pagination")
+                    break
+                page_num += 1
+    
+    async def _crawl_pages_pooled(self, engine, window, pool):
+        """Fetch pages into a bounded queue of parse jobs and collect their records in order"""
+        queue = asyncio.Queue(maxsize=pool.workers * 2)
+        
+        async def produce():
+            try:
+                async with aclosing(engine.prefetch(self.iter_page_urls(), window)) as pages:
+                    page_num = self.start_page
+                    async for html_content in pages:
+                        if html_content is None:
+                            job = None
+                        elif not html_content:
+                            job = _EMPTY_PAGE
+                        else:
+                            unchanged = self.fingerprint_page(page_num, html_content) if self.fingerprints else None
+                            # A page unchanged since the last run passes on its item count instead of being parsed
+                            job = unchanged if unchanged is not None else asyncio.wrap_future(pool.submit(html_content))
+                        await queue.put(job)
+                        page_num += 1
+            except Exception as e:
+                # Hand fetch errors (e.g. an exhausted error budget) to the consumer
+                await queue.put(e)
+                return
+            await queue.put(_END_OF_PAGES)
+        
+        producer = asyncio.ensure_future(produce())
+        page_num = self.start_page
+        try:
+            while self.room() > 0:
+                job = await queue.get()
+                if job is _END_OF_PAGES:
+                    break
+                if isinstance(job, Exception):
+                    raise job
+                if isinstance(job, int):
+                    self.skip_unchanged(page_num, job)
+                    found = job
+                else:
+                    if job is None:
+                        records = None
+                    elif job is _EMPTY_PAGE:
+                        records = []
+                    else:
+                        records = await job
+                    found = self.add_records(records, page_num)
+                await self.wait_for_details_async()
+                if found == 0:
+                    logger.info("No more items found, stopping pagination")
+                    break
+                page_num += 1
+        finally:
+            producer.cancel()
+            while not queue.empty():
+                job = queue.get_nowait()
+                if isinstance(job, asyncio.Future):
+                    job.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+    
+    def add_records(self, records, page_num):
+        """Append records parsed elsewhere, honoring max_items, and return how many were found"""
+        if records is None:
+            return self.process_page(None, page_num)
+        logger.info(f"Found {len(records)} items on page {page_num}")
+        self.deliver(records[:max(self.room(), 0)], page_num)
+        return len(records)
     
     def save_to_csv(self, filename='scraped_data.csv'):
         """Save scraped data to CSV file"""
@@ -217,6 +594,7 @@ def create_config_template():
     """Create a template configuration file"""
     template = {
         "base_url": "https://example.com/jobs",
+        "parser": "auto",
         "item_selector": "div.job-item, .listing",
         "fields": {
             "title": {
@@ -247,11 +625,45 @@ def create_config_template():
         "pagination": {
             "enabled": True,
             "pattern": "?page={page}",
-            "max_pages": 100
+            "max_pages": 100,
+            "prefetch": 4
         },
         "rate_limiting": {
             "delay_min": 0.5,
-            "delay_max": 1.0
+            "delay_max": 1.0,
+            "adaptive": True,
+            "slow_response": 5.0
+        },
+        "timeouts": {
+            "connect": 5,
+            "read": 30
+        },
+        "retry": {
+            "max_attempts": 4,
+            "base_delay": 1.0,
+            "max_delay": 30.0,
+            "max_failed_urls": 25,
+            "max_consecutive_errors": 8
+        },
+        "concurrency": {
+            "per_host": 4
+        },
+        "dedup": {
+            "enabled": True,
+            "key_fields": ["link"],
+            "mode": "auto"
+        },
+        "near_duplicates": {
+            "enabled": False,
+            "fields": ["title", "description"],
+            "threshold": 0.8,
+            "action": "drop"
+        },
+        "cache": {
+            "enabled": False,
+            "directory": ".scraper_cache",
+            "ttl": 3600,
+            "max_size_mb": 500
         },
         "max_items": 5000
     }
@@ -261,12 +673,157 @@ def create_config_template():
     
     print("Created scraper_config.json template file")
 
+def run_scraper(config_file, output, args, archive=None):
+    """Crawl one config into one output file, returning True if it completed"""
+    scraper = UniversalScraper(config_file, parser=args.parser, archive=archive)
+    if args.cache or args.cache_ttl:
+        cache_config = dict(scraper.config.get("cache", {}), enabled=True)
+        if args.cache_ttl:
+            cache_config["ttl"] = args.cache_ttl
+        scraper.cache = ResponseCache.from_config({"cache": cache_config})
+        scraper.transport.cache = scraper.cache
+    logger.info(f"Starting universal scraper for {config_file}...")
+    
+    checkpoint_path = args.checkpoint or f"{output}.checkpoint"
+    previous = Checkpoint.load(checkpoint_path) if args.resume else None
+    if previous and (previous.get("base_url") != scraper.config["base_url"] or previous.get("output") != output):
+        logger.warning(f"Checkpoint {checkpoint_path} belongs to a different crawl, starting from page 1")
+        previous = None
+    elif args.resume and not previous:
+        logger.info(f"No checkpoint found at {checkpoint_path}, starting from page 1")
+    
+    if args.dedup or args.dedup_mode:
+        if scraper.dedup:
+            scraper.dedup.close()
+        dedup_config = dict(scraper.config.get("dedup", {}), enabled=True)
+        if args.dedup_mode:
+            dedup_config["mode"] = args.dedup_mode
+        scraper.dedup = Deduplicator.from_config(dict(scraper.config, dedup=dedup_config))
+    
+    if args.near_duplicates:
+        scraper.near_dups = NearDuplicateFilter.from_config(scraper.config, action=args.near_duplicates)
+    
+    if args.incremental:
+        fingerprint_path = args.fingerprints or f"{output}.fingerprints"
+        scraper.fingerprints = FingerprintStore.from_config(scraper.config, fingerprint_path)
+        logger.info(f"Incremental run {scraper.fingerprints.run}, fingerprints in {fingerprint_path}")
+    
+    try:
+        # Records are written and flushed page by page as they are scraped
+        offset, count = (previous.get("output_offset"), previous.get("items", 0)) if previous else (None, 0)
+        with open_sink(output, args.format, offset=offset, count=count) as sink:
+            scraper.sink = sink
+            scraper.checkpoint = previous or Checkpoint(checkpoint_path)
+            # Detail pages fetched before an interruption are reused on --resume
+            scraper.frontier_path = f"{output}.frontier"
+            if not previous:
+                discard_frontier(scraper.frontier_path)
+            if previous:
+                scraper.resume_from(previous)
+            scraper.scrape_all(
+                use_async=args.use_async, concurrency=args.concurrency, prefetch=args.prefetch,
+                parse_workers=args.parse_workers
+            )
+        
+        if scraper.cache:
+            scraper.cache.log_stats()
+        scraper.transport.coalescer.log_stats()
+        if scraper.dedup:
+            scraper.dedup.log_stats()
+        if scraper.near_dups:
+            scraper.near_dups.log_stats()
+        logger.info("Scraping completed successfully!")
+        return True
+        
+    except ErrorBudgetExceeded as e:
+        logger.error(f"Aborting crawl: {e}. Run again with --resume to continue after the last saved page")
+    except Exception as e:
+        logger.error(f"Scraping failed: {e}")
+    finally:
+        if scraper.fingerprints:
+            scraper.fingerprints.close()
+        if scraper.dedup:
+            scraper.dedup.close()
+    return False
+
+def batch_configs(pattern):
+    """Expand a directory (all its *.json files) or a glob into a sorted list of configs"""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*.json')
+    return sorted(glob.glob(pattern))
+
+def config_host(config_file):
+    """The host a config crawls, or the file itself if it cannot be read"""
+    try:
+        with open(config_file, 'r') as f:
+            return urlparse(json.load(f).get("base_url", "")).netloc or config_file
+    except (OSError, ValueError):
+        return config_file
+
+def run_batch(args):
+    """Crawl every config matched by --batch concurrently, one output file per config.
+    
+    Configs for the same host run one after another so they never add up
+    against its rate limit; different hosts overlap, up to --jobs at a time.
+    """
+    configs = batch_configs(args.batch)
+    if not configs:
+        logger.error(f"No configs found for {args.batch}")
+        return False
+    
+    os.makedirs(args.output_dir, exist_ok=True)
+    archive = open_archive(args.record, args.replay)
+    by_host = {}
+    for config_file in configs:
+        by_host.setdefault(config_host(config_file), []).append(config_file)
+    
+    def run_host(host_configs):
+        results = []
+        for config_file in host_configs:
+            name = os.path.splitext(os.path.basename(config_file))[0]
+            threading.current_thread().name = name
+            output = os.path.join(args.output_dir, f"{name}.{args.format}")
+            results.append((config_file, run_scraper(config_file, output, args, archive)))
+        return results
+    
+    jobs = args.jobs or len(by_host)
+    logger.info(f"Running {len(configs)} configs for {len(by_host)} hosts, {jobs} at a time")
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = [result for host_results in pool.map(run_host, by_host.values()) for result in host_results]
+    
+    failed = [config_file for config_file, ok in results if not ok]
+    logger.info(f"Batch finished: {len(results) - len(failed)} of {len(results)} configs completed")
+    if failed:
+        logger.warning(f"Failed configs: {', '.join(failed)}")
+    return not failed
+
 def main():
     parser = argparse.ArgumentParser(description='Universal Web Scraper')
     parser.add_argument('--config', '-c', help='Configuration file path')
     parser.add_argument('--output', '-o', default='scraped_data.csv', help='Output file name')
-    parser.add_argument('--format', '-f', choices=['csv', 'json'], default='csv', help='Output format')
+    parser.add_argument('--format', '-f', choices=list(SINKS), default='csv', help='Output format')
     parser.add_argument('--template', '-t', action='store_true', help='Create config template')
+    parser.add_argument('--batch', metavar='DIR_OR_GLOB', help='Crawl every matching config concurrently')
+    parser.add_argument('--jobs', '-j', type=int, default=4, help='Configs crawled at the same time (with --batch)')
+    parser.add_argument('--output-dir', default='.', help='Directory for per-config outputs (with --batch)')
+    parser.add_argument('--parser', choices=['auto'] + list(BACKENDS), help='HTML parser backend (overrides config)')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='Fetch pages concurrently')
+    parser.add_argument('--concurrency', type=int, help='Requests in flight per host (with --async)')
+    parser.add_argument('--prefetch', type=int, help='Pages to fetch ahead of the parser (with --async)')
+    parser.add_argument('--parse-workers', type=int, help='Parse pages in this many worker processes (with --async)')
+    parser.add_argument('--cache', action='store_true', help='Cache responses on disk between runs')
+    parser.add_argument('--cache-ttl', type=int, help='Seconds before a cached page is revalidated')
+    parser.add_argument('--record', metavar='ARCHIVE', help='Record every response to an archive')
+    parser.add_argument('--replay', metavar='ARCHIVE', help='Serve responses from an archive instead of the network')
+    parser.add_argument('--resume', action='store_true', help='Continue an interrupted crawl from its checkpoint')
+    parser.add_argument('--checkpoint', help='Checkpoint file (default: <output>.checkpoint)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Skip pages unchanged since the last run and output only new, changed and removed records')
+    parser.add_argument('--dedup', action='store_true', help='Drop records whose key fields were already output')
+    parser.add_argument('--dedup-mode', choices=DEDUP_MODES, help='How seen keys are stored (implies --dedup)')
+    parser.add_argument('--near-duplicates', choices=NEAR_DUP_ACTIONS,
+                        help='Drop records whose title and description nearly match an earlier one, or cluster them')
+    parser.add_argument('--fingerprints', help='Fingerprint store for --incremental (default: <output>.fingerprints)')
     
     args = parser.parse_args()
     
@@ -274,26 +831,29 @@ def main():
         create_config_template()
         return
     
+    if args.incremental and args.resume:
+        parser.error("--incremental cannot be combined with --resume; rerun the whole crawl instead")
+    
+    if args.batch:
+        if args.checkpoint:
+            parser.error("--checkpoint cannot be used with --batch; each output gets its own checkpoint")
+        if args.fingerprints:
+            parser.error("--fingerprints cannot be used with --batch; each output gets its own fingerprint store")
+        logging.getLogger().handlers[0].setFormatter(
+            logging.Formatter('%(asctime)s - %(threadName)s - %(levelname)s - %(message)s')
+        )
+        if not run_batch(args):
+            sys.exit(1)
+        return
+    
     if not args.config:
         print("Error: Configuration file required. Use --template to create a template.")
         print("Usage: python3 universal_scraper.py --config scraper_config.json")
         return
     
-    scraper = UniversalScraper(args.config)
-    logger.info("Starting universal scraper...")
-    
-    try:
-        data = scraper.scrape_all()
-        
-        if args.format == 'csv':
-            scraper.save_to_csv(args.output)
-        else:
-            scraper.save_to_json(args.output.replace('.csv', '.json'))
-        
-        logger.info("Scraping completed successfully!")
-        
-    except Exception as e:
-        logger.error(f"Scraping failed: {e}")
+    output = args.output if args.format == 'csv' else args.output.replace('.csv', f'.{args.format}')
+    if not run_scraper(args.config, output, args, open_archive(args.record, args.replay)):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file